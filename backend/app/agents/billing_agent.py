@@ -3,14 +3,14 @@ Billing Support Agent - Hybrid RAG/CAG Strategy
 Implements RAG for initial query, then caches policy information in context (CAG)
 """
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.chains import ConversationalRetrievalChain
 from langchain_community.vectorstores import Chroma
 from langchain.memory import ConversationBufferMemory
 from langchain_core.prompts import PromptTemplate
+from agents.llm_provider import make_chat_llm, make_embeddings
+from vector_index import ensure_collection, get_or_create_collection
 
 CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 BILLING_COLLECTION = "billing_docs"
 
 # Session-level cache for static policy information (CAG component)
@@ -20,7 +20,9 @@ POLICY_CACHE = {}
 def get_billing_retriever(k=4):
     """Get retriever for billing documents."""
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        embeddings = make_embeddings()
+        # Create with configured index parameters, not the wrapper's defaults
+        ensure_collection(BILLING_COLLECTION)
         vectordb = Chroma(
             persist_directory=CHROMA_PATH,
             collection_name=BILLING_COLLECTION,
@@ -32,7 +34,7 @@ def get_billing_retriever(k=4):
         import chromadb
         client = chromadb.PersistentClient(path=CHROMA_PATH)
         try:
-            client.create_collection(BILLING_COLLECTION)
+            get_or_create_collection(client, BILLING_COLLECTION)
             vectordb = Chroma(
                 persist_directory=CHROMA_PATH,
                 collection_name=BILLING_COLLECTION,
@@ -48,11 +50,7 @@ def make_billing_agent():
     - RAG: Retrieves relevant billing docs from vector DB
     - CAG: Caches static policy info after first retrieval for session
     """
-    chat = ChatOpenAI(
-        temperature=0.0,
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo"
-    )
+    chat = make_chat_llm(temperature=0.0)
     retriever = get_billing_retriever()
     memory = ConversationBufferMemory(
         memory_key="chat_history",
@@ -0,0 +1,141 @@
+"""
+Extractive Agent - Degraded No-LLM Strategy
+Answers from retrieved chunks alone by selecting the most relevant sentences,
+with source/page citations. Used when the LLM providers are slow or saturated.
+"""
+import os, re, math
+import chromadb
+from agents.llm_provider import make_embeddings
+from vector_index import index_params
+from traffic_capture import capture_stage, record_route, record_chunks
+
+CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+SEARCH_COLLECTIONS = ["billing_docs", "tech_docs", "pdf_docs"]
+EXTRACTIVE_MAX_SENTENCES = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "3"))
+
+DEGRADED_NOTICE = "(Limited mode: this answer was assembled directly from our documents without AI generation.)"
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in", "on", "for", "and", "or",
+    "do", "does", "did", "i", "you", "we", "my", "your", "our", "it", "this", "that", "what", "how",
+    "when", "where", "why", "which", "who", "can", "could", "should", "would", "with", "about", "at",
+    "by", "from", "as", "if", "me", "there", "any", "have", "has",
+}
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_TOKEN = re.compile(r"[a-z0-9$%]+")
+
+# Cached handles: this path runs during incidents and must stay cheap
+_client = None
+_embeddings = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _client
+
+def _get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = make_embeddings()
+    return _embeddings
+
+def _tokens(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+def merge_results(chunks: list) -> list:
+    """
+    Order chunks retrieved from several collections. Distances are only comparable
+    within one distance space, so collections with different spaces (see
+    vector_index.index_params) are merged by their per-collection rank instead.
+    """
+    spaces = {index_params(c["collection"])["space"] for c in chunks}
+    if len(spaces) <= 1:
+        return sorted(chunks, key=lambda c: c["distance"])
+    return sorted(chunks, key=lambda c: c["rank"])  # Stable: ties keep collection order
+
+def retrieve_chunks(question: str, k: int = 4, collections: list = None) -> list:
+    """Vector search across the agent collections, merged by distance (or rank across spaces)."""
+    query_emb = _get_embeddings().embed_query(question)
+    client = _get_client()
+    chunks = []
+    for name in collections or SEARCH_COLLECTIONS:
+        try:
+            col = client.get_collection(name)
+        except Exception:
+            continue  # Collection not created yet
+        result = col.query(query_embeddings=[query_emb], n_results=k, include=["documents", "metadatas", "distances"])
+        rows = zip(result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0])
+        for rank, (cid, text, meta, dist) in enumerate(rows):
+            chunks.append({"id": cid, "text": text or "", "metadata": meta or {}, "distance": dist,
+                           "collection": name, "rank": rank})
+    return merge_results(chunks)[:k]
+
+def _citation(meta: dict) -> str:
+    source = meta.get("filename") or os.path.basename(meta.get("source", "")) or "document"
+    if "page" in meta:
+        # PyPDFLoader pages are 0-indexed
+        return f"[{source}, p. {int(meta['page']) + 1}]"
+    return f"[{source}]"
+
+def select_sentences(question: str, chunks: list, max_sentences: int = EXTRACTIVE_MAX_SENTENCES) -> list:
+    """
+    Score every sentence of the retrieved chunks by IDF-weighted overlap with the
+    question (plus a small bonus for higher-ranked chunks) and keep the best ones.
+    Returns (sentence, citation) pairs in document order.
+    """
+    query_terms = set(_tokens(question))
+    candidates = []
+    for rank, chunk in enumerate(chunks):
+        for pos, sentence in enumerate(_SENTENCE_SPLIT.split(" ".join(chunk["text"].split()))):
+            if len(sentence) < 20:
+                continue
+            candidates.append((rank, pos, sentence, set(_tokens(sentence)), _citation(chunk["metadata"])))
+    if not candidates or not query_terms:
+        return []
+
+    # IDF over the candidate sentences so rare question terms count more
+    doc_freq = {t: sum(1 for c in candidates if t in c[3]) for t in query_terms}
+    idf = {t: math.log((1 + len(candidates)) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+    scored = []
+    for rank, pos, sentence, terms, citation in candidates:
+        overlap = sum(idf[t] for t in query_terms & terms)
+        if overlap == 0:
+            continue
+        score = overlap / math.sqrt(len(terms) or 1) + 0.1 / (rank + 1)
+        scored.append((score, rank, pos, sentence, citation))
+
+    best = sorted(scored, key=lambda s: s[0], reverse=True)[:max_sentences]
+    best.sort(key=lambda s: (s[1], s[2]))
+    seen = set()
+    selected = []
+    for _, _, _, sentence, citation in best:
+        if sentence not in seen:
+            seen.add(sentence)
+            selected.append((sentence, citation))
+    return selected
+
+def answer_extractively(question: str, k: int = 4, check_faq: bool = True) -> str:
+    """
+    Degraded answer without any LLM call: a precomputed FAQ answer if one matches,
+    else retrieval plus sentence selection. check_faq=False skips the FAQ lookup
+    (when the orchestrator already missed it for this question).
+    """
+    if check_faq:
+        from faq_answers import find_faq_answer
+        faq_match = find_faq_answer(question)
+        if faq_match:
+            record_route("faq")
+            return faq_match["answer"]
+    record_route("extractive")
+    with capture_stage("retrieve"):
+        chunks = retrieve_chunks(question, k=k)
+    record_chunks([c["id"] for c in chunks])
+    with capture_stage("extract"):
+        selected = select_sentences(question, chunks)
+    if not selected:
+        return f"{DEGRADED_NOTICE}\n\nI couldn't find a relevant passage in the uploaded documents. Please try again shortly."
+    lines = [f"- {sentence} {citation}" for sentence, citation in selected]
+    return DEGRADED_NOTICE + "\n\n" + "\n".join(lines)
@@ -0,0 +1,441 @@
+"""
+LLM Provider Abstraction - Hedged requests across OpenAI and Bedrock
+Sends a duplicate request to the secondary provider once the primary is slower
+than its usual latency percentile and uses whichever answers first.
+Traffic capture records (and playback serves) calls around whichever model is used.
+"""
+import os, time, threading, contextvars
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Any, List, Optional
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_aws import ChatBedrock
+from botocore.config import Config
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage, AIMessage
+from langchain_core.outputs import ChatResult, ChatGeneration
+import traffic_capture
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+# Point providers at local fake endpoints for testing (unset = real services)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL") or None
+
+ENABLE_HEDGING = os.getenv("ENABLE_LLM_HEDGING", "false").lower() == "true"
+# Hedge once the primary is slower than this percentile of its recent latencies
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Hedge delay used until enough latency samples exist, and its lower bound
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "2.0"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2"))
+# Overall budget for one LLM call including retries
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# During playback, sleep for the recorded provider latency to keep original timings
+PLAYBACK_LATENCY = os.getenv("PROVIDER_PLAYBACK_LATENCY", "true").lower() == "true"
+# Capture/playback wrap models in a passive RecordedChatModel; only hedging races providers
+RECORD_OR_PLAYBACK = traffic_capture.CAPTURE_ENABLED or bool(traffic_capture.PLAYBACK_PATH)
+
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker: opens after consecutive failures and, after a
+    cool-down, half-opens to let a single trial request through.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def allow(self) -> bool:
+        """
+        Closed breakers let every request through; half-open ones only one trial
+        request at a time. Call right before sending: a granted trial must end
+        in record_success or record_failure.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.probing:
+                # Also re-opens a half-open breaker whose trial request failed
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+class ProviderStats:
+    """Rolling latency samples and counters for one provider."""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+# Shared across all model instances: agents are rebuilt per request
+_breakers = {}
+_stats = {}
+# "hedged": duplicates sent because the primary was slow; "failovers": because it failed
+_hedge_counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "failover_wins": 0, "retries": 0}
+_metrics_lock = threading.Lock()
+
+def _breaker(name: str) -> CircuitBreaker:
+    with _metrics_lock:
+        return _breakers.setdefault(name, CircuitBreaker())
+
+def _provider_stats(name: str) -> ProviderStats:
+    with _metrics_lock:
+        return _stats.setdefault(name, ProviderStats())
+
+def _count(key: str):
+    with _metrics_lock:
+        _hedge_counts[key] += 1
+
+def _start_call(fn, *args) -> Future:
+    """
+    Run a provider call on its own thread. Never queued behind other calls (as in a
+    bounded pool), so the hedge delay and deadline only measure provider latency.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-call", daemon=True).start()
+    return future
+
+def _invoke_inner(model: BaseChatModel, messages, stop=None, **kwargs):
+    """
+    Invoke a wrapped model in an empty context, so callbacks (e.g. the traffic
+    capture handler) see only the outer call and tokens aren't counted twice.
+    """
+    return contextvars.Context().run(model.invoke, messages, stop=stop, **kwargs)
+
+def get_llm_metrics() -> dict:
+    """Hedging and per-provider metrics (latency percentiles, errors, breaker state, wins)."""
+    with _metrics_lock:
+        counts = dict(_hedge_counts)
+        names = list(_stats)
+    providers = {}
+    for name in names:
+        stats = _provider_stats(name)
+        providers[name] = {
+            "calls": stats.calls,
+            "errors": stats.errors,
+            "wins": stats.wins,
+            "p50_seconds": stats.percentile(50),
+            "p95_seconds": stats.percentile(95),
+            "p99_seconds": stats.percentile(99),
+            "breaker": _breaker(name).state,
+        }
+    counts["hedge_win_rate"] = counts["hedge_wins"] / counts["hedged"] if counts["hedged"] else 0.0
+    return {**counts, "providers": providers}
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that races a primary and a secondary provider.
+    The secondary is only called when the primary exceeds its hedge delay,
+    fails, or has an open circuit breaker.
+    """
+    primary: BaseChatModel
+    primary_name: str
+    secondary: Optional[BaseChatModel] = None
+    secondary_name: str = ""
+    deadline_seconds: float = LLM_DEADLINE_SECONDS
+    max_retries: int = LLM_MAX_RETRIES
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat"
+
+    def _providers(self) -> list:
+        providers = [(self.primary_name, self.primary)]
+        if self.secondary is not None:
+            providers.append((self.secondary_name, self.secondary))
+        return providers
+
+    def _next_allowed(self, candidates: list):
+        """Pop candidates until one whose breaker admits a request (checked only when about to send)."""
+        while candidates:
+            name, model = candidates.pop(0)
+            if _breaker(name).allow():
+                return name, model
+        return None
+
+    def _call_provider(self, name: str, model: BaseChatModel, messages, stop, deadline: float):
+        start = time.monotonic()
+        kwargs = {}
+        if isinstance(model, ChatOpenAI):
+            # Per-request timeout so calls past the deadline give their thread back
+            kwargs["timeout"] = max(0.1, deadline - start)
+        try:
+            message = _invoke_inner(model, messages, stop, **kwargs)
+        except Exception:
+            _provider_stats(name).record(time.monotonic() - start, ok=False)
+            _breaker(name).record_failure()
+            raise
+        _provider_stats(name).record(time.monotonic() - start, ok=True)
+        _breaker(name).record_success()
+        return name, message
+
+    def _hedge_delay(self, name: str) -> float:
+        observed = _provider_stats(name).percentile(HEDGE_PERCENTILE)
+        return max(HEDGE_MIN_DELAY, observed if observed is not None else HEDGE_DEFAULT_DELAY)
+
+    def _race(self, messages, stop, deadline: float):
+        backups = self._providers()
+        first = self._next_allowed(backups)
+        if first is None:
+            raise RuntimeError("All LLM providers are unavailable (circuit breakers open)")
+
+        first_name, first_model = first
+        if not backups:
+            # Nothing to hedge with: call inline, bounded by the per-call timeout
+            name, message = self._call_provider(first_name, first_model, messages, stop, deadline)
+            _provider_stats(name).record_win()
+            return name, message
+        pending = {_start_call(self._call_provider, first_name, first_model, messages, stop, deadline)}
+        hedged = False
+        duplicate_kind = None  # "hedge" (primary slow) or "failover" (primary failed)
+        last_error = None
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = min(remaining, self._hedge_delay(first_name)) if backups and not hedged else remaining
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    name, message = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                _provider_stats(name).record_win()
+                if duplicate_kind and name != first_name:
+                    _count("hedge_wins" if duplicate_kind == "hedge" else "failover_wins")
+                return name, message
+            # Primary is slow (nothing done) or failed: send the duplicate request
+            if backups and not hedged:
+                hedged = True
+                backup = self._next_allowed(backups)
+                if backup is None:
+                    continue
+                duplicate_kind = "failover" if done else "hedge"
+                _count("hedged" if duplicate_kind == "hedge" else "failovers")
+                backup_name, backup_model = backup
+                pending.add(_start_call(self._call_provider, backup_name, backup_model, messages, stop, deadline))
+
+        if last_error is not None and not pending:
+            raise last_error
+        raise TimeoutError(f"LLM call exceeded its {self.deadline_seconds:.1f}s deadline")
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        _count("requests")
+        start = time.monotonic()
+        deadline = start + self.deadline_seconds
+        attempt = 0
+        while True:
+            try:
+                name, message = self._race(messages, stop, deadline)
+                # Lets RecordedChatModel attribute the answer to the winning provider
+                message.response_metadata["llm_provider"] = name
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except TimeoutError:
+                raise
+            except Exception:
+                attempt += 1
+                remaining = deadline - time.monotonic()
+                # Only retry if a typical call still fits in the remaining budget
+                expected = _provider_stats(self.primary_name).percentile(50) or HEDGE_MIN_DELAY
+                backoff = min(0.5 * 2 ** (attempt - 1), remaining / 2)
+                if attempt > self.max_retries or remaining - backoff < expected:
+                    raise
+                _count("retries")
+                time.sleep(max(0.0, backoff))
+
+class RecordedChatModel(BaseChatModel):
+    """
+    Passive traffic-capture wrapper around one chat model: records each call's
+    response and latency, or serves it from the capture during playback.
+    """
+    inner: BaseChatModel
+    provider_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = traffic_capture.provider_call_key(messages, stop)
+        recorded = traffic_capture.playback_response(key)
+        if recorded is not None:
+            if PLAYBACK_LATENCY:
+                time.sleep(recorded["latency"])
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=recorded["content"]))])
+
+        start = time.monotonic()
+        message = _invoke_inner(self.inner, messages, stop, **kwargs)
+        provider = message.response_metadata.get("llm_provider", self.provider_name)
+        traffic_capture.record_provider_call(key, provider, message.content, time.monotonic() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def make_openai_llm(temperature: float = 0.0, model: str = OPENAI_MODEL):
+    """OpenAI chat model (honours OPENAI_BASE_URL for fake endpoints)."""
+    return ChatOpenAI(
+        temperature=temperature,
+        openai_api_key=OPENAI_API_KEY,
+        model=model,
+        base_url=OPENAI_BASE_URL,
+        timeout=LLM_DEADLINE_SECONDS,  # HedgedChatModel narrows this per call to the remaining deadline
+        max_retries=0 if ENABLE_HEDGING else 2  # Retries are deadline-aware in HedgedChatModel
+    )
+
+def make_bedrock_llm(temperature: float = 0.0, model_id: str = BEDROCK_MODEL_ID):
+    """Bedrock chat model (honours BEDROCK_ENDPOINT_URL for fake endpoints)."""
+    return ChatBedrock(
+        model_id=model_id,
+        region_name=AWS_REGION,
+        endpoint_url=BEDROCK_ENDPOINT_URL,
+        temperature=temperature,
+        # boto3 has no per-call timeout: bound every read by the overall deadline
+        config=Config(
+            connect_timeout=min(5.0, LLM_DEADLINE_SECONDS),
+            read_timeout=LLM_DEADLINE_SECONDS,
+            retries={"max_attempts": 1 if ENABLE_HEDGING else 3}
+        )
+    )
+
+def make_chat_llm(temperature: float = 0.0, primary: str = "openai"):
+    """
+    Create the chat model used by agents.
+    With ENABLE_LLM_HEDGING=true, returns a HedgedChatModel over OpenAI and Bedrock
+    (primary first), otherwise the primary provider itself. With traffic capture or
+    playback on, either is wrapped in a RecordedChatModel.
+    """
+    factories = {"openai": make_openai_llm, "bedrock": make_bedrock_llm}
+    secondary = "bedrock" if primary == "openai" else "openai"
+    llm = factories[primary](temperature=temperature)
+
+    if ENABLE_HEDGING:
+        secondary_llm = None
+        try:
+            secondary_llm = factories[secondary](temperature=temperature)
+        except Exception as e:
+            print(f"Secondary LLM provider '{secondary}' not available, hedging disabled: {e}")
+        llm = HedgedChatModel(
+            primary=llm,
+            primary_name=primary,
+            secondary=secondary_llm,
+            secondary_name=secondary if secondary_llm is not None else ""
+        )
+    if RECORD_OR_PLAYBACK:
+        llm = RecordedChatModel(inner=llm, provider_name=primary)
+    return llm
+
+class RecordedEmbeddings(Embeddings):
+    """Embeddings wrapper that records calls for traffic capture and plays them back."""
+
+    def __init__(self, inner: Embeddings, name: str = "openai-embeddings"):
+        self.inner = inner
+        self.name = name
+
+    def _call(self, kind: str, texts: list, fn):
+        key = traffic_capture.embedding_call_key(kind, texts)
+        recorded = traffic_capture.playback_response(key, kind="embeddings")
+        if recorded is not None:
+            if PLAYBACK_LATENCY:
+                time.sleep(recorded["latency"])
+            return recorded["content"]
+        start = time.monotonic()
+        result = fn()
+        traffic_capture.record_provider_call(key, self.name, result, time.monotonic() - start)
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call("documents", texts, lambda: self.inner.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call("query", [text], lambda: self.inner.embed_query(text))
+
+def make_embeddings(recorded: bool = True, **kwargs):
+    """
+    OpenAI embeddings (honours OPENAI_BASE_URL for fake endpoints). Query-time embeddings
+    are recorded/played back with traffic capture; ingestion passes recorded=False.
+    """
+    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, **kwargs)
+    return RecordedEmbeddings(embeddings) if recorded and RECORD_OR_PLAYBACK else embeddings
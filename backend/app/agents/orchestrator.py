@@ -4,15 +4,13 @@ Routes queries to appropriate specialized worker agents
 """
 import os
 from typing import Literal, TypedDict
-from langchain_openai import ChatOpenAI
-from langchain_aws import ChatBedrock
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from agents.llm_provider import make_chat_llm
+from traffic_capture import timed_stage, record_route
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 USE_BEDROCK = os.getenv("USE_BEDROCK", "false").lower() == "true"
 
 # Agent types
@@ -24,25 +22,22 @@ class AgentState(TypedDict):
     agent_type: str
     answer: str
     chat_history: list
+    error: str  # Set when the agent failed (e.g. LLM provider error)
+
+class AgentError(RuntimeError):
+    """Raised by orchestrate_question when the routed agent failed to answer."""
 
 def get_orchestrator_llm():
     """Get LLM for orchestrator - use AWS Bedrock for cost-effective routing."""
     if USE_BEDROCK:
         try:
-            return ChatBedrock(
-                model_id="anthropic.claude-3-haiku-20240307-v1:0",
-                region_name=AWS_REGION,
-                temperature=0.0
-            )
+            # Bedrock primary; with hedging enabled OpenAI is raced as the secondary
+            return make_chat_llm(temperature=0.0, primary="bedrock")
         except Exception as e:
             print(f"Bedrock not available, falling back to OpenAI: {e}")
     
-    # Fallback to OpenAI
-    return ChatOpenAI(
-        temperature=0.0,
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo"  # Cost-effective for routing
-    )
+    # Fallback to OpenAI (cost-effective for routing)
+    return make_chat_llm(temperature=0.0, primary="openai")
 
 def route_question(state: AgentState) -> AgentState:
     """
@@ -78,6 +73,7 @@ def call_billing_agent(state: AgentState) -> AgentState:
     """Call billing support agent."""
     from agents.billing_agent import make_billing_agent, answer_with_hybrid_rag_cag
     
+    error = ""
     try:
         agent = make_billing_agent()
         answer = answer_with_hybrid_rag_cag(state["question"], agent)
@@ -85,26 +81,30 @@ def call_billing_agent(state: AgentState) -> AgentState:
             answer = "I couldn't find information about billing. Please ensure billing documents are uploaded."
     except Exception as e:
         answer = f"I encountered an error while processing your billing question: {str(e)}"
+        error = str(e)
     
-    return {**state, "answer": answer}
+    return {**state, "answer": answer, "error": error}
 
 def call_technical_agent(state: AgentState) -> AgentState:
     """Call technical support agent."""
     from agents.technical_agent import make_technical_agent
     
+    error = ""
     try:
         agent = make_technical_agent()
         result = agent({"question": state["question"]})
         answer = result.get("answer", "I couldn't find relevant technical information. Please ensure technical documents are uploaded.")
     except Exception as e:
         answer = f"I encountered an error while processing your technical question: {str(e)}"
+        error = str(e)
     
-    return {**state, "answer": answer}
+    return {**state, "answer": answer, "error": error}
 
 def call_policy_agent(state: AgentState) -> AgentState:
     """Call policy & compliance agent."""
     from agents.policy_agent import make_policy_agent, answer_with_cag
     
+    error = ""
     try:
         chain, memory = make_policy_agent()
         answer = answer_with_cag(state["question"], chain, memory)
@@ -112,21 +112,24 @@ def call_policy_agent(state: AgentState) -> AgentState:
             answer = "I couldn't generate a policy response. Please try rephrasing your question."
     except Exception as e:
         answer = f"I encountered an error while processing your policy question: {str(e)}"
+        error = str(e)
     
-    return {**state, "answer": answer}
+    return {**state, "answer": answer, "error": error}
 
 def call_general_agent(state: AgentState) -> AgentState:
     """Call general agent (fallback)."""
     from agents.retrieval_agent import make_conversational_agent
     
+    error = ""
     try:
         agent = make_conversational_agent()
         result = agent({"question": state["question"]})
         answer = result.get("answer", "I couldn't generate a response.")
     except Exception as e:
         answer = f"I'm sorry, I encountered an error: {str(e)}"
+        error = str(e)
     
-    return {**state, "answer": answer}
+    return {**state, "answer": answer, "error": error}
 
 def should_route(state: AgentState) -> str:
     """Decide which agent to route to."""
@@ -139,11 +142,11 @@ def create_orchestrator_graph():
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("route", route_question)
-    workflow.add_node("billing", call_billing_agent)
-    workflow.add_node("technical", call_technical_agent)
-    workflow.add_node("policy", call_policy_agent)
-    workflow.add_node("general", call_general_agent)
+    workflow.add_node("route", timed_stage("route", route_question))
+    workflow.add_node("billing", timed_stage("billing", call_billing_agent))
+    workflow.add_node("technical", timed_stage("technical", call_technical_agent))
+    workflow.add_node("policy", timed_stage("policy", call_policy_agent))
+    workflow.add_node("general", timed_stage("general", call_general_agent))
     
     # Set entry point
     workflow.set_entry_point("route")
@@ -190,10 +193,17 @@ def orchestrate_question(question: str, config: dict = None, thread_id: str = "d
         question: User's question
         config: Optional LangGraph configuration
         thread_id: Thread ID for conversation history tracking
+    
+    Raises:
+        AgentError: if the routed agent failed (its error answer is not returned)
     """
     if config is None:
         config = {"configurable": {"thread_id": thread_id}}
     
+    # Fast path: serve precomputed FAQ answers without routing, retrieval or generation
+    from faq_answers import find_faq_answer
+    faq_match = find_faq_answer(question)
+    
     app = get_orchestrator_graph()
     
     # Get existing state if available (for conversation history)
@@ -209,10 +219,18 @@ def orchestrate_question(question: str, config: dict = None, thread_id: str = "d
         "question": question,
         "agent_type": "",
         "answer": "",
-        "chat_history": chat_history
+        "chat_history": chat_history,
+        "error": ""
     }
     
-    result = app.invoke(initial_state, config=config)
+    if faq_match:
+        result = {**initial_state, "agent_type": "faq", "answer": faq_match["answer"]}
+    else:
+        result = app.invoke(initial_state, config=config)
+    record_route(result["agent_type"])
+    if result.get("error"):
+        # Let the caller fall back (e.g. degraded extractive answers) instead of showing the error text
+        raise AgentError(f"{result['agent_type']} agent failed: {result['error']}")
     
     # Update chat history with new interaction
     updated_history = chat_history + [
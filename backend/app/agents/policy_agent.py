@@ -2,12 +2,10 @@
 Policy & Compliance Agent - Pure CAG Strategy
 Uses only static context from pre-loaded policy documents (no vector retrieval)
 """
-import os
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.memory import ConversationBufferMemory
+from agents.llm_provider import make_chat_llm
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 # Static policy context (in production, this would be loaded from files)
 POLICY_CONTEXT = """
@@ -35,11 +33,7 @@ def make_policy_agent():
     Create policy agent with Pure CAG (Context-Augmented Generation).
     Uses static policy context without vector retrieval.
     """
-    chat = ChatOpenAI(
-        temperature=0.0,
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo"
-    )
+    chat = make_chat_llm(temperature=0.0)
     
     # Create prompt template with static policy context
     prompt = ChatPromptTemplate.from_messages([
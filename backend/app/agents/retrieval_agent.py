@@ -1,8 +1,9 @@
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.chains import ConversationalRetrievalChain
 from langchain_community.vectorstores import Chroma
 from langchain.memory import ConversationBufferMemory
+from agents.llm_provider import make_chat_llm, make_embeddings
+from vector_index import ensure_collection, get_or_create_collection
 
 CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -10,7 +11,9 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 def get_retriever(k=4):
     """Get a retriever from ChromaDB. Returns None if collection doesn't exist."""
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        embeddings = make_embeddings()
+        # Create with configured index parameters, not the wrapper's defaults
+        ensure_collection("pdf_docs")
         vectordb = Chroma(
             persist_directory=CHROMA_PATH,
             collection_name="pdf_docs",
@@ -25,7 +28,7 @@ def get_retriever(k=4):
         import chromadb
         client = chromadb.PersistentClient(path=CHROMA_PATH)
         try:
-            client.create_collection("pdf_docs")
+            get_or_create_collection(client, "pdf_docs")
             vectordb = Chroma(
                 persist_directory=CHROMA_PATH,
                 collection_name="pdf_docs",
@@ -40,11 +43,7 @@ def make_conversational_agent():
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
     
-    chat = ChatOpenAI(
-        temperature=0.0,
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo"  # Use cost-effective model
-    )
+    chat = make_chat_llm(temperature=0.0)
     retriever = get_retriever()
     memory = ConversationBufferMemory(
         memory_key="chat_history",
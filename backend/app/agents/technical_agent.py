@@ -3,19 +3,21 @@ Technical Support Agent - Pure RAG Strategy
 Uses only retrieval-augmented generation from dynamic knowledge base
 """
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.chains import ConversationalRetrievalChain
 from langchain_community.vectorstores import Chroma
 from langchain.memory import ConversationBufferMemory
+from agents.llm_provider import make_chat_llm, make_embeddings
+from vector_index import ensure_collection, get_or_create_collection
 
 CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 TECH_COLLECTION = "tech_docs"
 
 def get_technical_retriever(k=5):
     """Get retriever for technical documents."""
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        embeddings = make_embeddings()
+        # Create with configured index parameters, not the wrapper's defaults
+        ensure_collection(TECH_COLLECTION)
         vectordb = Chroma(
             persist_directory=CHROMA_PATH,
             collection_name=TECH_COLLECTION,
@@ -27,7 +29,7 @@ def get_technical_retriever(k=5):
         import chromadb
         client = chromadb.PersistentClient(path=CHROMA_PATH)
         try:
-            client.create_collection(TECH_COLLECTION)
+            get_or_create_collection(client, TECH_COLLECTION)
             vectordb = Chroma(
                 persist_directory=CHROMA_PATH,
                 collection_name=TECH_COLLECTION,
@@ -42,11 +44,7 @@ def make_technical_agent():
     Create technical support agent with Pure RAG.
     Always retrieves from dynamic knowledge base (no caching).
     """
-    chat = ChatOpenAI(
-        temperature=0.0,
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo"
-    )
+    chat = make_chat_llm(temperature=0.0)
     retriever = get_technical_retriever()
     memory = ConversationBufferMemory(
         memory_key="chat_history",
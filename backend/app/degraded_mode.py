@@ -0,0 +1,71 @@
+"""
+Degraded Mode - overload detection for /chat
+Switches to the extractive (no-LLM) agent when the latency SLO or the number
+of in-flight requests is breached.
+"""
+import os, time, threading
+from collections import deque
+
+# Auto-degrade when p95 /chat latency over the window exceeds this many seconds
+DEGRADED_LATENCY_SLO_SECONDS = float(os.getenv("DEGRADED_LATENCY_SLO_SECONDS", "15"))
+# Auto-degrade when this many requests are already being answered
+DEGRADED_MAX_INFLIGHT = int(os.getenv("DEGRADED_MAX_INFLIGHT", "20"))
+# Only latencies from the last window count, so the mode recovers on its own
+DEGRADED_WINDOW_SECONDS = float(os.getenv("DEGRADED_WINDOW_SECONDS", "60"))
+DEGRADED_AUTO = os.getenv("DEGRADED_AUTO", "true").lower() == "true"
+MIN_SAMPLES = 5
+
+class OverloadMonitor:
+    """Tracks recent full-mode latencies and in-flight requests."""
+
+    def __init__(self):
+        self.samples = deque()
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self.samples and now - self.samples[0][0] > DEGRADED_WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def request_started(self):
+        with self._lock:
+            self.inflight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def record_latency(self, seconds: float):
+        """Record the latency of a full (LLM) answer."""
+        now = time.monotonic()
+        with self._lock:
+            self.samples.append((now, seconds))
+            self._prune(now)
+
+    def p95_latency(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(s for _, s in self.samples)
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def should_degrade(self) -> bool:
+        if not DEGRADED_AUTO:
+            return False
+        if self.inflight >= DEGRADED_MAX_INFLIGHT:
+            return True
+        p95 = self.p95_latency()
+        return p95 is not None and p95 > DEGRADED_LATENCY_SLO_SECONDS
+
+    def status(self) -> dict:
+        return {
+            "auto": DEGRADED_AUTO,
+            "degraded": self.should_degrade(),
+            "inflight": self.inflight,
+            "p95_latency_seconds": self.p95_latency(),
+            "latency_slo_seconds": DEGRADED_LATENCY_SLO_SECONDS,
+            "max_inflight": DEGRADED_MAX_INFLIGHT,
+        }
+
+overload_monitor = OverloadMonitor()
@@ -0,0 +1,177 @@
+"""
+Precomputed FAQ Answers - ingestion-time question/answer pairs
+Derives likely Q/A pairs from each document at ingestion time and serves
+high-similarity matches at query time without retrieval or generation.
+"""
+import os, json, hashlib
+from datetime import datetime, timezone
+from langchain_core.prompts import ChatPromptTemplate
+import chromadb
+from agents.llm_provider import make_chat_llm, make_embeddings
+from vector_index import get_or_create_collection
+from traffic_capture import capture_stage, record_chunks
+
+CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+FAQ_COLLECTION = "faq_answers"
+
+# Optional ingestion stage (off by default - it costs one LLM call per document)
+ENABLE_FAQ_PRECOMPUTE = os.getenv("ENABLE_FAQ_PRECOMPUTE", "false").lower() == "true"
+FAQ_PAIRS_PER_DOC = int(os.getenv("FAQ_PAIRS_PER_DOC", "15"))
+# Cosine similarity a question must reach to be served from the FAQ collection
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.92"))
+# Max characters of document text sent to the LLM when deriving pairs
+FAQ_SOURCE_CHARS = 12000
+
+# Cached handles so the query-time lookup doesn't rebuild clients per request
+_faq_collection = None
+_faq_embeddings = None
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file (versions FAQ pairs; the ingest manifest uses it to detect changes)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def get_faq_collection(create: bool = False):
+    """Get the FAQ collection (cosine space). Returns None if it doesn't exist and create is False."""
+    global _faq_collection
+    if _faq_collection is None:
+        client = chromadb.PersistentClient(path=CHROMA_PATH)
+        try:
+            _faq_collection = client.get_collection(FAQ_COLLECTION)
+        except Exception:
+            if not create:
+                return None
+            # Created with cosine space (see vector_index.COLLECTION_DEFAULTS)
+            _faq_collection = get_or_create_collection(client, FAQ_COLLECTION)
+    return _faq_collection
+
+def _get_embeddings():
+    global _faq_embeddings
+    if _faq_embeddings is None:
+        _faq_embeddings = make_embeddings()
+    return _faq_embeddings
+
+def _parse_pairs(content: str) -> list:
+    """Parse the LLM's JSON answer, tolerating markdown code fences."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`")
+        if content.startswith("json"):
+            content = content[4:]
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return []
+    pairs = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get("question", "")).strip()
+        answer = str(item.get("answer", "")).strip()
+        if question and answer:
+            pairs.append({"question": question, "answer": answer})
+    return pairs
+
+def generate_faq_pairs(texts: list, filename: str) -> list:
+    """Ask the LLM for the questions customers are most likely to ask about a document."""
+    source = "\n\n".join(texts)[:FAQ_SOURCE_CHARS]
+    if not source.strip():
+        return []
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You write customer support FAQs. From the document below, produce up to {n} question/answer pairs
+that customers are most likely to ask. Answers must be complete, self-contained and based ONLY on the document.
+
+Respond with ONLY a JSON array of objects with "question" and "answer" keys."""),
+        ("human", "Document: {filename}\n\n{source}")
+    ])
+    chat = make_chat_llm(temperature=0.0)
+    response = (prompt | chat).invoke({"n": FAQ_PAIRS_PER_DOC, "filename": filename, "source": source})
+    return _parse_pairs(response.content)[:FAQ_PAIRS_PER_DOC]
+
+def drop_faq_pairs(source: str):
+    """Remove a document's FAQ pairs (on every re-ingest, so a changed document never serves stale answers)."""
+    col = get_faq_collection()
+    if col is not None:
+        col.delete(where={"source": source})
+
+def store_faq_pairs(pairs: list, metadata: dict, doc_version: str):
+    """Replace the FAQ pairs of a document (keyed by its source path) with a new version."""
+    source = metadata["source"]
+    col = get_faq_collection(create=True)
+    # Drop pairs generated from any previous version of this document
+    col.delete(where={"source": source})
+    if not pairs:
+        return
+
+    questions = [p["question"] for p in pairs]
+    embs = _get_embeddings().embed_documents(questions)
+    generated_at = datetime.now(timezone.utc).isoformat()
+    metadatas = []
+    for p in pairs:
+        mm = {k: v for k, v in metadata.items() if isinstance(v, (str, int, float, bool))}
+        mm.update({"answer": p["answer"], "doc_version": doc_version, "generated_at": generated_at})
+        metadatas.append(mm)
+    # Same-named files in different folders must not share ids
+    source_key = hashlib.sha256(source.encode()).hexdigest()[:16]
+    ids = [f"{source_key}:{doc_version}:{i}" for i in range(len(pairs))]
+    col.add(documents=questions, embeddings=embs, ids=ids, metadatas=metadatas)
+
+def precompute_faq_answers(pdf_path: str, texts: list, metadata: dict):
+    """Ingestion stage: derive Q/A pairs for a document and store them versioned by content hash."""
+    metadata = {
+        **metadata,
+        "source": metadata.get("source") or os.path.abspath(pdf_path),
+        "filename": metadata.get("filename") or os.path.basename(pdf_path),
+    }
+    doc_version = file_sha256(pdf_path)[:16]
+    pairs = generate_faq_pairs(texts, metadata["filename"])
+    store_faq_pairs(pairs, metadata, doc_version)
+    print(f"Stored {len(pairs)} FAQ answers for {metadata['filename']} (version {doc_version})")
+    return pairs
+
+def lookup_faq_answer(question: str, threshold: float = None):
+    """
+    Serve a precomputed answer if the question closely matches a stored FAQ.
+    Returns the match dict (answer, question, similarity, metadata) or None.
+    """
+    threshold = FAQ_MATCH_THRESHOLD if threshold is None else threshold
+    col = get_faq_collection()
+    if col is None or col.count() == 0:
+        return None
+
+    query_emb = _get_embeddings().embed_query(question)
+    result = col.query(query_embeddings=[query_emb], n_results=1, include=["documents", "metadatas", "distances"])
+    if not result["ids"] or not result["ids"][0]:
+        return None
+
+    # Cosine distance -> similarity
+    similarity = 1.0 - result["distances"][0][0]
+    if similarity < threshold:
+        return None
+    meta = result["metadatas"][0][0]
+    return {
+        "id": result["ids"][0][0],
+        "question": result["documents"][0][0],
+        "answer": meta.get("answer", ""),
+        "similarity": similarity,
+        "metadata": meta,
+    }
+
+def find_faq_answer(question: str):
+    """
+    Request-time FAQ fast path shared by the orchestrator and the degraded path:
+    timed as the "faq_lookup" stage, and a failing lookup is treated as a miss.
+    """
+    try:
+        with capture_stage("faq_lookup"):
+            match = lookup_faq_answer(question)
+    except Exception as e:
+        print(f"FAQ lookup failed, continuing without it: {e}")
+        return None
+    if match:
+        record_chunks([match["id"]])
+    return match
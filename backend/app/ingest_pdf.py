@@ -1,19 +1,48 @@
-import os, uuid
+import os, re, uuid, glob, json, time, threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 import chromadb
+from faq_answers import ENABLE_FAQ_PRECOMPUTE, precompute_faq_answers, drop_faq_pairs, file_sha256
+from agents.llm_provider import make_embeddings
+from vector_index import get_or_create_collection
 
 CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "./ingest_manifest.jsonl")
+# Assign chunks to collections by their content (false = by filename only)
+CONTENT_ROUTING = os.getenv("CONTENT_ROUTING", "true").lower() == "true"
+DEFAULT_COLLECTION = "pdf_docs"
 
-def init_chroma(collection_name: str = "pdf_docs"):
-    """Initialize ChromaDB collection."""
-    client = chromadb.PersistentClient(path=CHROMA_PATH)
-    try:
-        col = client.get_collection(collection_name)
-    except Exception:
-        col = client.create_collection(collection_name)
+# Local keyword classifier for content routing, one entry per agent collection.
+# Only domain-specific terms: everyday words ("rest", "plan", "app", "interest"...) misroute general text.
+TOPIC_KEYWORDS = {
+    "billing_docs": [
+        "fee", "fees", "price", "pricing", "cost", "billing", "invoice", "payment", "subscription",
+        "commission", "commissions", "charge", "charged", "refund", "withdrawal", "withdrawals",
+        "wire transfer", "discount",
+    ],
+    "tech_docs": [
+        "api", "login", "log in", "password", "authentication", "2fa", "error code", "bug", "endpoint",
+        "endpoints", "rate limit", "rate limits", "mobile app", "browser", "cookies", "data feed",
+        "troubleshoot", "integration", "sdk", "timeout", "stack trace", "rest api",
+    ],
+}
+# A chunk/page needs this many keyword hits, and the winner this share of all hits, to be assigned by content
+MIN_TOPIC_HITS = int(os.getenv("CONTENT_ROUTING_MIN_HITS", "2"))
+MIN_TOPIC_SCORE = float(os.getenv("CONTENT_ROUTING_MIN_SCORE", "0.7"))
+ROUTED_COLLECTIONS = list(TOPIC_KEYWORDS) + [DEFAULT_COLLECTION]
+_TOPIC_PATTERNS = {
+    name: re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(words, key=len, reverse=True)) + r")\b")
+    for name, words in TOPIC_KEYWORDS.items()
+}
+
+def init_chroma(collection_name: str = "pdf_docs", client=None):
+    """Initialize ChromaDB collection (reusing the given client if any)."""
+    client = client or chromadb.PersistentClient(path=CHROMA_PATH)
+    col = get_or_create_collection(client, collection_name)
     return client, col
 
 def get_collection_name(filename: str) -> str:
@@ -24,40 +53,284 @@ def get_collection_name(filename: str) -> str:
     elif any(word in filename_lower for word in ["tech", "api", "login", "technical", "faq", "bug"]):
         return "tech_docs"
     else:
-        return "pdf_docs"  # Default collection
+        return DEFAULT_COLLECTION  # Default collection
+
+def classify_text(text: str):
+    """
+    Classify text into an agent collection by keyword hits.
+    Returns (collection, score) with score the winner's share of all hits,
+    or (None, 0.0) when there is no clear signal (too few hits or too low a score).
+    """
+    text_lower = text.lower()
+    hits = Counter({name: len(pattern.findall(text_lower)) for name, pattern in _TOPIC_PATTERNS.items()})
+    ranked = hits.most_common(2)
+    best, best_hits = ranked[0]
+    runner_up_hits = ranked[1][1] if len(ranked) > 1 else 0
+    if best_hits < MIN_TOPIC_HITS or best_hits == runner_up_hits:
+        return None, 0.0
+    score = best_hits / sum(hits.values())
+    if score < MIN_TOPIC_SCORE:
+        return None, 0.0
+    return best, score
+
+def assign_collections(chunks: list, pages: list, filename: str, collection_name: str = None) -> list:
+    """
+    Choose a collection per chunk: the chunk's own content, else its page's content,
+    else the filename. Returns (collection, assignment metadata) per chunk.
+    """
+    if collection_name is not None:
+        return [(collection_name, {"collection": collection_name, "topic_source": "explicit"}) for _ in chunks]
+    fallback = get_collection_name(filename)
+    if not CONTENT_ROUTING:
+        return [(fallback, {"collection": fallback, "topic_source": "filename"}) for _ in chunks]
+
+    page_topics = {p.metadata.get("page"): classify_text(p.page_content) for p in pages}
+    assignments = []
+    for c in chunks:
+        topic, score = classify_text(c.page_content)
+        source = "chunk"
+        if topic is None:
+            topic, score = page_topics.get(c.metadata.get("page"), (None, 0.0))
+            source = "page"
+        if topic is None:
+            topic, score, source = fallback, 0.0, "filename"
+        assignments.append((topic, {"collection": topic, "topic_source": source, "topic_score": round(score, 3)}))
+    return assignments
+
+def embed_texts(embeddings, texts: list, batch_size: int = None, executor=None) -> list:
+    """Embed texts, in batches of batch_size run concurrently on executor when given."""
+    if not batch_size or executor is None or len(texts) <= batch_size:
+        return embeddings.embed_documents(texts)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    futures = [executor.submit(embeddings.embed_documents, batch) for batch in batches]
+    return [emb for f in futures for emb in f.result()]
 
-def ingest_pdf_file(pdf_path: str, metadata: dict = None, collection_name: str = None):
-    """Ingest PDF into ChromaDB collection."""
+def delete_source_chunks(client, source: str, collections) -> None:
+    """Delete every chunk of a source document from the given collections (missing ones are skipped)."""
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    for name in set(collections):
+        if name in existing:
+            client.get_collection(name).delete(where={"source": source})
+
+def ingest_pdf_file(pdf_path: str, metadata: dict = None, collection_name: str = None, precompute_faq: bool = None,
+                    client=None, embeddings=None, embed_batch_size: int = None, embed_executor=None, write_lock=None,
+                    previous_collections: list = None):
+    """
+    Ingest PDF into ChromaDB collection, optionally deriving precomputed FAQ answers.
+    Bulk ingestion passes a shared client/embedder, batching executor and write lock.
+    Chunks are assigned to collections by content unless collection_name is given.
+    Any chunks already stored for the same source (in the collections this file can be
+    written to, plus previous_collections) are replaced, so re-ingesting never duplicates,
+    and its precomputed FAQ pairs are dropped.
+    Returns ingestion stats (pages, chunks, collections, embed_seconds, embed_interval).
+    """
     metadata = metadata or {}
+    if precompute_faq is None:
+        precompute_faq = ENABLE_FAQ_PRECOMPUTE
     filename = os.path.basename(pdf_path)
     
-    # Determine collection name if not provided
-    if collection_name is None:
-        collection_name = get_collection_name(filename)
-    
     loader = PyPDFLoader(pdf_path)
     pages = loader.load()
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
     chunks = splitter.split_documents(pages)
     texts = [c.page_content for c in chunks]
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    embs = embeddings.embed_documents(texts)
-    client, col = init_chroma(collection_name)
+    embeddings = embeddings or make_embeddings(recorded=False)
+    embed_start = time.monotonic()
+    embs = embed_texts(embeddings, texts, embed_batch_size, embed_executor) if texts else []
+    embed_end = time.monotonic()
     ids = [str(uuid.uuid4()) for _ in texts]
+    assignments = assign_collections(chunks, pages, filename, collection_name)
     metadatas = []
-    for c in chunks:
+    for chunk_id, c, (_, assignment) in zip(ids, chunks, assignments):
         mm = metadata.copy()
+        # Stored in metadata too: LangChain's Chroma retriever returns Documents without ids
+        mm["chunk_id"] = chunk_id
         try:
             if "page" in c.metadata: mm["page"]=c.metadata["page"]
         except: pass
+        mm.update(assignment)
         metadatas.append(mm)
-    col.add(documents=texts, embeddings=embs, ids=ids, metadatas=metadatas)
-    print(f"Ingested {len(texts)} chunks from {pdf_path} into collection '{collection_name}'")
+    
+    # Write each chunk to its assigned collection
+    by_collection = {}
+    for i, (name, _) in enumerate(assignments):
+        by_collection.setdefault(name, []).append(i)
+    with write_lock or nullcontext():
+        client = client or chromadb.PersistentClient(path=CHROMA_PATH)
+        if metadata.get("source"):
+            candidates = [collection_name] if collection_name else ROUTED_COLLECTIONS
+            delete_source_chunks(client, metadata["source"], list(candidates) + list(previous_collections or []))
+            # Pairs from an older version must go even if precompute is off or fails below
+            drop_faq_pairs(metadata["source"])
+        for name, idx in by_collection.items():
+            client, col = init_chroma(name, client)
+            col.add(documents=[texts[i] for i in idx], embeddings=[embs[i] for i in idx],
+                    ids=[ids[i] for i in idx], metadatas=[metadatas[i] for i in idx])
+    counts = {name: len(idx) for name, idx in by_collection.items()}
+    print(f"Ingested {len(texts)} chunks from {pdf_path} into collections {counts}")
+
+    if precompute_faq:
+        try:
+            precompute_faq_answers(pdf_path, texts, {**metadata, "filename": metadata.get("filename", filename)})
+        except Exception as e:
+            # FAQ answers are an optimization - never fail ingestion because of them
+            print(f"Error precomputing FAQ answers for {pdf_path}: {e}")
+
+    return {"pages": len(pages), "chunks": len(texts), "collections": counts,
+            "embed_seconds": embed_end - embed_start, "embed_interval": (embed_start, embed_end)}
+
+# ---- Bulk ingestion ----
+def expand_pdf_paths(patterns: list) -> list:
+    """Resolve files, directories (recursively) and glob patterns to a sorted list of PDF paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(pattern, "**", "*.PDF"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True) or ([pattern] if os.path.isfile(pattern) else [])
+        paths.update(os.path.abspath(m) for m in matches if m.lower().endswith(".pdf") and os.path.isfile(m))
+    return sorted(paths)
+
+def load_manifest(manifest_path: str) -> dict:
+    """
+    Read the append-only JSONL manifest into {path: entry}; later lines win.
+    A line cut short by an interrupted run is ignored.
+    """
+    manifest = {}
+    if not os.path.exists(manifest_path):
+        return manifest
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and entry.get("path"):
+                manifest[entry["path"]] = entry
+    return manifest
+
+def save_manifest(manifest: dict, manifest_path: str):
+    """Rewrite the manifest with one line per file (compacts superseded entries), atomically."""
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for path in sorted(manifest):
+            f.write(json.dumps({**manifest[path], "path": path}, sort_keys=True) + "\n")
+    os.replace(tmp_path, manifest_path)
+
+def append_manifest(f, path: str, entry: dict):
+    """Record one completed file; flushed so an interrupted run keeps it."""
+    f.write(json.dumps({**entry, "path": path}, sort_keys=True) + "\n")
+    f.flush()
+
+def busy_seconds(intervals: list) -> float:
+    """Wall-clock time covered by possibly overlapping (start, end) intervals."""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+def ingest_paths(patterns: list, workers: int = 4, embed_batch_size: int = 64, embed_workers: int = 4,
+                 manifest_path: str = MANIFEST_PATH, collection_name: str = None, precompute_faq: bool = None,
+                 force: bool = False) -> dict:
+    """
+    Bulk-ingest PDFs from files, directories or globs with one shared Chroma client and embedder.
+    Files already in the manifest with the same hash are skipped, so interrupted runs resume.
+    force re-ingests them anyway; the manifest is still used to drop their old chunks.
+    """
+    paths = expand_pdf_paths(patterns)
+    manifest = load_manifest(manifest_path)
+    # Compact once per run; completed files are then appended, one line each
+    save_manifest(manifest, manifest_path)
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+    embeddings = make_embeddings(recorded=False, chunk_size=embed_batch_size)
+    write_lock = threading.Lock()
+    manifest_lock = threading.Lock()
+    totals = {"files": 0, "skipped": 0, "failed": 0, "pages": 0, "chunks": 0, "embed_seconds": 0.0}
+    embed_intervals = []
+
+    def ingest_one(path: str):
+        digest = file_sha256(path)
+        previous = manifest.get(path) or {}
+        if previous.get("sha256") == digest and not force:
+            return "skipped", None
+        # ingest_pdf_file replaces any stored chunks of this file, including those of a
+        # run killed before the file reached the manifest
+        previous_collections = [name for name in previous.get("collections") or [previous.get("collection")] if name]
+        metadata = {"source": path, "filename": os.path.basename(path)}
+        stats = ingest_pdf_file(path, metadata=metadata, collection_name=collection_name, precompute_faq=precompute_faq,
+                                client=client, embeddings=embeddings, embed_batch_size=embed_batch_size,
+                                embed_executor=embed_executor, write_lock=write_lock,
+                                previous_collections=previous_collections)
+        with manifest_lock:
+            manifest[path] = {
+                "sha256": digest,
+                "pages": stats["pages"],
+                "chunks": stats["chunks"],
+                "collections": stats["collections"],
+                "ingested_at": datetime.now(timezone.utc).isoformat(),
+            }
+            append_manifest(manifest_file, path, manifest[path])
+        return "ingested", stats
+
+    started = time.monotonic()
+    with open(manifest_path, "a") as manifest_file, \
+         ThreadPoolExecutor(max_workers=embed_workers) as embed_executor, \
+         ThreadPoolExecutor(max_workers=workers) as file_executor:
+        futures = {file_executor.submit(ingest_one, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                status, stats = future.result()
+            except Exception as e:
+                totals["failed"] += 1
+                print(f"Error ingesting {futures[future]}: {e}")
+                continue
+            if status == "skipped":
+                totals["skipped"] += 1
+                continue
+            totals["files"] += 1
+            totals["pages"] += stats["pages"]
+            totals["chunks"] += stats["chunks"]
+            totals["embed_seconds"] += stats["embed_seconds"]
+            embed_intervals.append(stats["embed_interval"])
+    totals["elapsed_seconds"] = time.monotonic() - started
+    # Wall-clock time with at least one embedding call in flight
+    totals["embed_wall_seconds"] = busy_seconds(embed_intervals)
+    return totals
+
+def print_ingest_summary(totals: dict):
+    elapsed = totals["elapsed_seconds"] or 1e-9
+    print(f"Ingested {totals['files']} files ({totals['skipped']} unchanged, skipped; {totals['failed']} failed) in {elapsed:.1f}s")
+    print(f"  pages/sec:  {totals['pages'] / elapsed:.1f} ({totals['pages']} pages)")
+    print(f"  chunks/sec: {totals['chunks'] / elapsed:.1f} ({totals['chunks']} chunks)")
+    if totals["embed_wall_seconds"]:
+        # embed_seconds is summed over concurrently ingested files, embed_wall_seconds is not
+        print(f"  embeddings/sec: {totals['chunks'] / totals['embed_wall_seconds']:.1f} while embedding "
+              f"({totals['embed_wall_seconds']:.1f}s wall clock), "
+              f"{totals['chunks'] / totals['embed_seconds']:.1f} per file worker")
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("usage: python ingest_pdf.py path/to/file.pdf")
-    else:
-        ingest_pdf_file(sys.argv[1])
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingest PDFs into ChromaDB")
+    parser.add_argument("paths", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=4, help="Files ingested in parallel")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Chunks per embedding request")
+    parser.add_argument("--embed-workers", type=int, default=4, help="Embedding requests in flight")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Manifest of completed files used to resume")
+    parser.add_argument("--collection", default=None, help="Force a collection instead of choosing by content")
+    parser.add_argument("--faq", action="store_true", default=None, help="Precompute FAQ answers for each document")
+    parser.add_argument("--force", action="store_true", help="Re-ingest files even if unchanged (old chunks are still replaced)")
+    args = parser.parse_args()
 
+    totals = ingest_paths(args.paths, workers=args.workers, embed_batch_size=args.embed_batch_size,
+                          embed_workers=args.embed_workers, manifest_path=args.manifest,
+                          collection_name=args.collection, precompute_faq=args.faq, force=args.force)
+    print_ingest_summary(totals)
@@ -3,13 +3,19 @@ from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional
-import shutil, os, asyncio, json
+import shutil, os, asyncio, json, time
 from agents.orchestrator import orchestrate_question
+from agents.llm_provider import get_llm_metrics
+from agents.extractive_agent import answer_extractively
+from degraded_mode import overload_monitor
+from traffic_capture import start_capture, finish_capture, playback_stats
+from vector_index import index_stats
 
 # Pydantic models for request/response validation
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     message: str = Field(..., min_length=1, max_length=2000, description="User message to send to the AI agent")
+    degraded: Optional[bool] = Field(None, description="Force extractive no-LLM mode (true) or full mode (false); automatic when omitted")
 
 class ChatResponse(BaseModel):
     """Response model for streaming chunks."""
@@ -45,11 +51,38 @@ app.add_middleware(
 
 # Orchestrator is stateless, no initialization needed
 
-async def stream_agent_answer(user_msg: str):
+async def get_agent_answer(user_msg: str, degraded: Optional[bool] = None) -> str:
+    """Answer with the orchestrator, or extractively when degraded (forced or under overload)."""
+    use_degraded = overload_monitor.should_degrade() if degraded is None else degraded
+    if use_degraded:
+        return await asyncio.to_thread(answer_extractively, user_msg)
+    
+    overload_monitor.request_started()
+    start = time.monotonic()
+    try:
+        # Run in a worker thread so concurrent requests don't block the event loop
+        answer = await asyncio.to_thread(orchestrate_question, user_msg)
+    except Exception as e:
+        print(f"Orchestrator or agent failed, serving degraded answer: {e}")
+        overload_monitor.record_latency(time.monotonic() - start)
+        # The orchestrator already tried the FAQ fast path before routing
+        return await asyncio.to_thread(answer_extractively, user_msg, check_faq=False)
+    finally:
+        overload_monitor.request_finished()
+    overload_monitor.record_latency(time.monotonic() - start)
+    return answer
+
+async def stream_agent_answer(user_msg: str, degraded: Optional[bool] = None):
     """Stream answer from orchestrator agent."""
+    capture = start_capture(user_msg, degraded=degraded)
     try:
         # Use orchestrator to route and get answer
-        answer = orchestrate_question(user_msg)
+        try:
+            answer = await get_agent_answer(user_msg, degraded)
+        except Exception as e:
+            finish_capture(capture, error=str(e))
+            raise
+        finish_capture(capture, answer=answer)
         
         if not answer:
             answer = "No answer was generated. Please ensure documents are uploaded and try again."
@@ -70,10 +103,11 @@ async def chat(chat_request: ChatRequest):
     Chat endpoint that routes queries to appropriate specialized agents.
     
     - **message**: User's question or message
+    - **degraded**: Optional, force extractive no-LLM answers (true) or full answers (false)
     - Returns: Streaming SSE response with AI-generated answer
     """
     return StreamingResponse(
-        stream_agent_answer(chat_request.message),
+        stream_agent_answer(chat_request.message, chat_request.degraded),
         media_type="text/event-stream"
     )
 
@@ -100,6 +134,26 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "Customer AI Backend"}
 
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """LLM provider metrics: per-provider latency percentiles, errors, circuit breaker state and hedge wins."""
+    return get_llm_metrics()
+
+@app.get("/metrics/overload")
+async def overload_metrics():
+    """Degraded-mode status: in-flight requests, recent p95 latency and whether answers are extractive."""
+    return overload_monitor.status()
+
+@app.get("/metrics/playback")
+async def playback_metrics():
+    """Provider playback status: recorded calls loaded and LLM/embedding calls with no recorded response."""
+    return playback_stats()
+
+@app.get("/admin/index-stats")
+async def admin_index_stats():
+    """Vector index stats: per-collection counts, HNSW configuration, on-disk size and probe query latency."""
+    return await asyncio.to_thread(index_stats)
+
 @app.post("/upload-pdf", response_model=UploadResponse)
 async def upload_pdf(
     file: UploadFile = File(...),
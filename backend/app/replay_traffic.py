@@ -0,0 +1,115 @@
+"""
+Traffic Replay - drive captured /chat traffic against a backend
+Replays requests recorded by traffic_capture at their original spacing (or
+scaled by --speed) and reports latency percentiles next to the captured ones.
+
+Run the target backend with PROVIDER_PLAYBACK_PATH pointing at the same capture
+so LLM and embedding calls are played back instead of hitting the providers.
+Calls with no recorded response (playback misses) are reported in the summary.
+"""
+import asyncio, argparse, hashlib, json, time
+import httpx
+from traffic_capture import capture_files, read_capture
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+async def send_request(client: httpx.AsyncClient, url: str, record: dict) -> dict:
+    """POST one captured message to /chat and read the SSE stream to completion."""
+    payload = {"message": record["message"]}
+    if record.get("degraded") is not None:
+        payload["degraded"] = record["degraded"]
+    start = time.monotonic()
+    chunks = []
+    error = None
+    try:
+        async with client.stream("POST", f"{url}/chat", json=payload) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                chunk = json.loads(line[6:]).get("chunk", "")
+                if chunk == "[DONE]":
+                    break
+                chunks.append(chunk)
+    except Exception as e:
+        error = str(e)
+    answer = "".join(chunks)
+    return {
+        "request_id": record.get("request_id"),
+        "latency": time.monotonic() - start,
+        "captured_latency": record.get("total_seconds"),
+        "answer_matches": hashlib.sha256(answer.encode()).hexdigest()[:16] == record.get("answer_sha"),
+        "error": error,
+    }
+
+async def replay(records: list, url: str, speed: float, concurrency: int, timeout: float) -> list:
+    """Schedule each record at its original offset divided by speed (speed <= 0 sends as fast as possible)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    t0 = records[0]["timestamp"]
+    start = time.monotonic()
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async def run(record):
+            if speed > 0:
+                delay = (record["timestamp"] - t0) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            async with semaphore:
+                return await send_request(client, url, record)
+
+        return await asyncio.gather(*(run(r) for r in records))
+
+def fetch_playback_stats(url: str):
+    """Playback status of the target backend, or None if it doesn't expose it."""
+    try:
+        response = httpx.get(f"{url}/metrics/playback", timeout=10.0)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+def print_summary(results: list, elapsed: float, playback_before=None, playback_after=None):
+    latencies = [r["latency"] for r in results if not r["error"]]
+    captured = [r["captured_latency"] for r in results if r["captured_latency"] is not None]
+    errors = sum(1 for r in results if r["error"])
+    matches = sum(1 for r in results if r["answer_matches"])
+    print(f"Replayed {len(results)} requests in {elapsed:.1f}s ({len(results) / elapsed:.1f} req/s), {errors} errors")
+    print(f"Identical answers: {matches}/{len(results)}")
+    print(f"{'':>10} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for label, values in (("replayed", latencies), ("captured", captured)):
+        cells = [percentile(values, p) for p in (50, 95, 99)]
+        print(f"{label:>10} " + " ".join(f"{c:8.3f}" if c is not None else f"{'-':>8}" for c in cells))
+    if playback_after is None:
+        print("Playback misses: unknown (backend does not expose /metrics/playback)")
+    elif not playback_after["enabled"]:
+        print("Playback misses: backend is not in playback mode - provider calls went to the live providers")
+    else:
+        before = (playback_before or {}).get("misses", {})
+        misses = {kind: n - before.get(kind, 0) for kind, n in playback_after["misses"].items()}
+        print(f"Playback misses: {misses.get('llm', 0)} LLM calls, {misses.get('embeddings', 0)} embedding calls "
+              f"(of {playback_after['recorded_calls']} recorded)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured /chat traffic against a backend")
+    parser.add_argument("capture", help="Capture directory or capture file glob")
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale: 1 = original, 2 = twice as fast, 0 = no delays")
+    parser.add_argument("--concurrency", type=int, default=100, help="Max requests in flight")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    records = sorted(read_capture(capture_files(args.capture)), key=lambda r: r["timestamp"])
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print(f"No captured requests found in {args.capture}")
+    else:
+        playback_before = fetch_playback_stats(args.url)
+        started = time.monotonic()
+        results = asyncio.run(replay(records, args.url, args.speed, args.concurrency, args.timeout))
+        elapsed = time.monotonic() - started
+        print_summary(results, elapsed, playback_before, fetch_playback_stats(args.url))
@@ -0,0 +1,231 @@
+"""
+Traffic Capture - per-request /chat records for offline replay
+Writes one JSON line per request (routing decision, retrieved chunk IDs, stage
+timings, token counts and provider responses) to rotating gzip-compressed logs,
+and plays recorded LLM and embedding responses back for deterministic, offline replays.
+"""
+import os, json, gzip, glob, time, uuid, hashlib, threading, atexit
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+CAPTURE_ENABLED = os.getenv("TRAFFIC_CAPTURE", "false").lower() == "true"
+CAPTURE_DIR = os.getenv("TRAFFIC_CAPTURE_DIR", "./traffic_capture")
+CAPTURE_MAX_RECORDS = int(os.getenv("TRAFFIC_CAPTURE_MAX_RECORDS", "10000"))  # per file before rotating
+CAPTURE_KEEP_FILES = int(os.getenv("TRAFFIC_CAPTURE_KEEP_FILES", "20"))
+# Capture file or directory whose provider responses are played back instead of calling LLMs/embeddings
+PLAYBACK_PATH = os.getenv("PROVIDER_PLAYBACK_PATH", "")
+
+_current_record = ContextVar("traffic_capture_record", default=None)
+_capture_handler = ContextVar("traffic_capture_handler", default=None)
+# Every LangChain run started while a handler is set (retrievers, LLMs) reports to it
+register_configure_hook(_capture_handler, inheritable=True)
+
+class CaptureCallbackHandler(BaseCallbackHandler):
+    """Collects retrieved chunk IDs and token usage for the current request."""
+
+    def __init__(self, record: dict):
+        self.record = record
+
+    def on_retriever_end(self, documents, **kwargs):
+        for doc in documents:
+            chunk_id = doc.metadata.get("chunk_id") or getattr(doc, "id", None)
+            if chunk_id:
+                self.record["chunk_ids"].append(chunk_id)
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = usage.get("prompt_tokens", 0)
+        completion = usage.get("completion_tokens", 0)
+        if not usage:
+            for generations in response.generations:
+                for gen in generations:
+                    meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    prompt += meta.get("input_tokens", 0)
+                    completion += meta.get("output_tokens", 0)
+        tokens = self.record["tokens"]
+        tokens["prompt"] += prompt
+        tokens["completion"] += completion
+        tokens["total"] += prompt + completion
+
+class CaptureWriter:
+    """Appends records to capture-<timestamp>.jsonl.gz, rotating after CAPTURE_MAX_RECORDS."""
+
+    def __init__(self, directory: str = CAPTURE_DIR):
+        self.directory = directory
+        self._file = None
+        self._records = 0
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        # Sub-second part keeps names in creation order (rotation and replay sort by name)
+        now = time.time_ns()
+        name = (time.strftime("capture-%Y%m%d-%H%M%S", time.localtime(now // 10**9))
+                + f"-{now % 10**9:09d}-{uuid.uuid4().hex[:6]}.jsonl.gz")
+        self._file = gzip.open(os.path.join(self.directory, name), "wt", encoding="utf-8")
+        self._records = 0
+        files = sorted(glob.glob(os.path.join(self.directory, "capture-*.jsonl.gz")))
+        for old in files[:-CAPTURE_KEEP_FILES]:
+            os.remove(old)
+
+    def write(self, record: dict):
+        with self._lock:
+            if self._file is None or self._records >= CAPTURE_MAX_RECORDS:
+                self._rotate()
+            self._file.write(json.dumps(record) + "\n")
+            # Sync flush keeps everything written so far readable if the process dies
+            self._file.flush()
+            self._records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_writer = CaptureWriter()
+atexit.register(_writer.close)
+
+def start_capture(message: str, thread_id: str = "default", degraded=None):
+    """Begin capturing the current request. Returns the record, or None if capture is disabled."""
+    if not CAPTURE_ENABLED:
+        return None
+    record = {
+        "request_id": uuid.uuid4().hex,
+        "timestamp": time.time(),
+        "message": message,
+        "thread_id": thread_id,
+        "degraded": degraded,  # As requested by the client (None = automatic)
+        "agent_type": "",
+        "chunk_ids": [],
+        "stages": {},
+        "tokens": {"prompt": 0, "completion": 0, "total": 0},
+        "provider_calls": [],
+        "playback_misses": 0,
+    }
+    _current_record.set(record)
+    _capture_handler.set(CaptureCallbackHandler(record))
+    record["_start"] = time.monotonic()
+    return record
+
+def finish_capture(record, answer: str = "", error: str = None):
+    """Write a captured request to the log."""
+    if record is None:
+        return
+    start = record.pop("_start")
+    record["total_seconds"] = time.monotonic() - start
+    record["answer_sha"] = hashlib.sha256((answer or "").encode()).hexdigest()[:16]
+    record["error"] = error
+    _current_record.set(None)
+    _capture_handler.set(None)
+    try:
+        _writer.write(record)
+    except Exception as e:
+        print(f"Error writing traffic capture: {e}")
+
+def record_route(agent_type: str):
+    record = _current_record.get()
+    if record is not None:
+        record["agent_type"] = agent_type
+
+def record_chunks(chunk_ids: list):
+    record = _current_record.get()
+    if record is not None:
+        record["chunk_ids"].extend(chunk_ids)
+
+@contextmanager
+def capture_stage(name: str):
+    """Time a stage of the current request (accumulates if the stage repeats)."""
+    record = _current_record.get()
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record["stages"][name] = record["stages"].get(name, 0.0) + time.monotonic() - start
+
+def timed_stage(name: str, fn):
+    """Wrap a function (e.g. a graph node) so its duration is captured as a stage."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with capture_stage(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+# ---- Provider call recording / playback ----
+def provider_call_key(messages, stop=None) -> str:
+    """Deterministic key for an LLM call: hash of the message types/contents and stop sequences."""
+    payload = [[m.type, m.content] for m in messages] + [stop or []]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def embedding_call_key(kind: str, texts: list) -> str:
+    """Deterministic key for an embedding call ("query" or "documents")."""
+    return hashlib.sha256(json.dumps(["embeddings", kind, texts]).encode()).hexdigest()
+
+def record_provider_call(key: str, provider: str, content, latency: float):
+    record = _current_record.get()
+    if record is not None:
+        record["provider_calls"].append({"key": key, "provider": provider, "content": content, "latency": latency})
+
+def capture_files(path: str) -> list:
+    """Capture files under a directory (oldest first), or the path itself."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "capture-*.jsonl.gz")))
+    return sorted(glob.glob(path))
+
+def read_capture(paths: list):
+    """Yield records from capture files, tolerating a file still being written."""
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            continue
+
+class PlaybackMiss(LookupError):
+    """A provider call had no recorded response (e.g. its prompt changed since capture)."""
+
+_playback = None
+_playback_misses = {"llm": 0, "embeddings": 0}
+_playback_lock = threading.Lock()
+
+def playback_stats() -> dict:
+    """Playback status and misses since startup, polled by replay_traffic.py."""
+    with _playback_lock:
+        return {
+            "enabled": bool(PLAYBACK_PATH),
+            "recorded_calls": len(_playback or {}),
+            "misses": dict(_playback_misses),
+        }
+
+def playback_response(key: str, kind: str = "llm"):
+    """
+    Recorded call for a provider request, or None when playback is disabled.
+    Raises PlaybackMiss (and counts it) when playback is on but nothing was recorded.
+    """
+    global _playback
+    if not PLAYBACK_PATH:
+        return None
+    if _playback is None:
+        _playback = {}
+        for record in read_capture(capture_files(PLAYBACK_PATH)):
+            for call in record.get("provider_calls", []):
+                _playback.setdefault(call["key"], call)
+        print(f"Loaded {len(_playback)} recorded provider responses from {PLAYBACK_PATH}")
+    call = _playback.get(key)
+    if call is None:
+        with _playback_lock:
+            _playback_misses[kind] += 1
+        record = _current_record.get()
+        if record is not None:
+            record["playback_misses"] += 1
+        print(f"Playback miss: no recorded {kind} response for call {key[:12]}")
+        raise PlaybackMiss(f"No recorded {kind} response for call {key[:12]}")
+    return call
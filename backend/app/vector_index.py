@@ -0,0 +1,285 @@
+"""
+Vector Index Management - HNSW tuning, stats and compaction for ChromaDB
+All collections are created through get_or_create_collection so their index
+parameters (space, M, construction ef, search ef) come from configuration.
+
+Usage:
+    python vector_index.py stats
+    python vector_index.py tune [collection ...]
+    python vector_index.py compact [collection ...] [--keep-duplicates]
+    python vector_index.py rebalance
+"""
+import os, json, time, sqlite3
+import chromadb
+
+CHROMA_PATH = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+
+# Defaults for every collection (Chroma's own defaults)
+INDEX_DEFAULTS = {
+    "space": os.getenv("CHROMA_HNSW_SPACE", "l2"),
+    "M": int(os.getenv("CHROMA_HNSW_M", "16")),
+    "construction_ef": int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "100")),
+    "search_ef": int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100")),
+}
+# Built-in per-collection overrides: FAQ lookups score by cosine similarity
+COLLECTION_DEFAULTS = {
+    "faq_answers": {"space": "cosine"},
+}
+# Per-collection overrides, e.g. CHROMA_INDEX_PARAMS='{"tech_docs": {"M": 32, "search_ef": 200}}'
+COLLECTION_OVERRIDES = json.loads(os.getenv("CHROMA_INDEX_PARAMS", "{}") or "{}")
+
+AGENT_COLLECTIONS = ["billing_docs", "tech_docs", "pdf_docs", "faq_answers"]
+COPY_BATCH_SIZE = 1000
+
+def index_params(collection_name: str) -> dict:
+    """Effective index parameters of a collection: defaults < built-in overrides < CHROMA_INDEX_PARAMS."""
+    return {
+        **INDEX_DEFAULTS,
+        **COLLECTION_DEFAULTS.get(collection_name, {}),
+        **COLLECTION_OVERRIDES.get(collection_name, {}),
+    }
+
+def hnsw_configuration(collection_name: str) -> dict:
+    """Chroma collection configuration for the collection's index parameters."""
+    params = index_params(collection_name)
+    return {"hnsw": {
+        "space": params["space"],
+        "max_neighbors": params["M"],
+        "ef_construction": params["construction_ef"],
+        "ef_search": params["search_ef"],
+    }}
+
+def get_or_create_collection(client, collection_name: str):
+    """Get a collection, creating it with its configured index parameters if missing."""
+    try:
+        return client.get_collection(collection_name)
+    except Exception:
+        return client.create_collection(collection_name, configuration=hnsw_configuration(collection_name))
+
+def ensure_collection(collection_name: str):
+    """Create the collection with configured parameters before LangChain's Chroma wrapper opens it."""
+    return get_or_create_collection(chromadb.PersistentClient(path=CHROMA_PATH), collection_name)
+
+# ---- Stats ----
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _segment_ids(collection_id: str) -> list:
+    """Segment IDs of a collection, read from Chroma's sqlite catalog."""
+    db_path = os.path.join(CHROMA_PATH, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM segments WHERE collection = ?", (collection_id,))]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+def _probe_latency(col, probes: int = 5, k: int = 4):
+    """Median latency (ms) of k-NN queries using stored vectors as probes."""
+    count = col.count()
+    if count == 0:
+        return None
+    sample = col.get(limit=probes, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    timings = []
+    for emb in embeddings:
+        start = time.perf_counter()
+        col.query(query_embeddings=[list(emb)], n_results=min(k, count), include=[])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def collection_stats(client, collection_name: str) -> dict:
+    col = client.get_collection(collection_name)
+    try:
+        configuration = json.loads(json.dumps(col.configuration, default=str))
+    except Exception:
+        configuration = col.metadata or {}
+    on_disk = sum(_dir_size(os.path.join(CHROMA_PATH, sid)) for sid in _segment_ids(str(col.id)))
+    return {
+        "name": collection_name,
+        "count": col.count(),
+        "configuration": configuration,
+        "configured_params": index_params(collection_name),
+        "vector_index_bytes": on_disk,
+        "query_latency_ms": _probe_latency(col),
+    }
+
+def index_stats() -> dict:
+    """Counts, configuration, on-disk size and probe query latency of every collection."""
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+    collections = []
+    for col in client.list_collections():
+        name = col if isinstance(col, str) else col.name
+        try:
+            collections.append(collection_stats(client, name))
+        except Exception as e:
+            collections.append({"name": name, "error": str(e)})
+    db_path = os.path.join(CHROMA_PATH, "chroma.sqlite3")
+    return {
+        "persist_directory": CHROMA_PATH,
+        "total_bytes": _dir_size(CHROMA_PATH),
+        "sqlite_bytes": os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+        "collections": collections,
+    }
+
+# ---- Tuning and compaction ----
+def tune_collection(client, collection_name: str):
+    """Apply the configured search ef (the only HNSW parameter Chroma can change in place)."""
+    col = client.get_collection(collection_name)
+    col.modify(configuration={"hnsw": {"ef_search": index_params(collection_name)["search_ef"]}})
+    print(f"Set search_ef={index_params(collection_name)['search_ef']} on '{collection_name}'")
+
+def _dedupe_key(document: str, metadata: dict):
+    metadata = metadata or {}
+    return (document, metadata.get("source") or metadata.get("filename"), metadata.get("page"))
+
+def compact_collection(client, collection_name: str, dedupe: bool = True) -> dict:
+    """
+    Rebuild a collection into a fresh index with its configured parameters,
+    dropping deleted vectors and (optionally) duplicate chunks of the same source/page.
+    The original is kept as a backup until the rebuild has taken its name.
+    """
+    rebuild_name = f"{collection_name}__rebuild"
+    backup_name = f"{collection_name}__backup"
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    if backup_name in existing:
+        # Interrupted during the swap: restore the original if it lost its name, else it's stale
+        if collection_name not in existing:
+            client.get_collection(backup_name).modify(name=collection_name)
+        else:
+            client.delete_collection(backup_name)
+    if rebuild_name in existing:
+        client.delete_collection(rebuild_name)  # Leftover from an interrupted run
+    source = client.get_collection(collection_name)
+    # Legacy "hnsw:*" metadata would conflict with the configured index parameters
+    metadata = {k: v for k, v in (source.metadata or {}).items() if not k.startswith("hnsw:")}
+    target = client.create_collection(rebuild_name, configuration=hnsw_configuration(collection_name),
+                                      metadata=metadata or None)
+
+    seen = set()
+    before = kept = 0
+    offset = 0
+    while True:
+        page = source.get(limit=COPY_BATCH_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        ids, embs, docs, metas = [], [], [], []
+        for i, record_id in enumerate(page["ids"]):
+            before += 1
+            key = _dedupe_key(page["documents"][i], page["metadatas"][i])
+            if dedupe and key in seen:
+                continue
+            seen.add(key)
+            ids.append(record_id)
+            embs.append(page["embeddings"][i])
+            docs.append(page["documents"][i])
+            metas.append(page["metadatas"][i] or None)
+        if ids:
+            target.add(ids=ids, embeddings=embs, documents=docs, metadatas=metas)
+            kept += len(ids)
+
+    # Swap by renaming so the original is never deleted before the rebuild replaces it
+    source.modify(name=backup_name)
+    try:
+        target.modify(name=collection_name)
+    except Exception:
+        source.modify(name=collection_name)
+        raise
+    client.delete_collection(backup_name)
+    print(f"Compacted '{collection_name}': {before} -> {kept} vectors ({before - kept} duplicates removed)")
+    return {"name": collection_name, "before": before, "after": kept}
+
+def rebalance_collections(client, collections: list = None, manifest_path: str = None) -> dict:
+    """
+    Re-classify stored chunks by content and move those now assigned elsewhere.
+    Chunks placed explicitly (topic_source "explicit") are left alone; chunks
+    without a clear content signal keep their current collection. The ingest
+    manifest's per-file collection counts are updated to match.
+    """
+    from ingest_pdf import classify_text, ROUTED_COLLECTIONS, MANIFEST_PATH, load_manifest, save_manifest
+
+    manifest_path = manifest_path or MANIFEST_PATH
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    moved = {}
+    moved_sources = []  # (source, from, to) per moved chunk
+    for name in [c for c in collections or ROUTED_COLLECTIONS if c in existing]:
+        source = client.get_collection(name)
+        offset = 0
+        moves = {}
+        while True:
+            page = source.get(limit=COPY_BATCH_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+            for i, record_id in enumerate(page["ids"]):
+                meta = page["metadatas"][i] or {}
+                if meta.get("topic_source") == "explicit":
+                    continue
+                topic, score = classify_text(page["documents"][i] or "")
+                if topic is None or topic == name:
+                    continue
+                meta = {**meta, "collection": topic, "topic_source": "rebalance", "topic_score": round(score, 3)}
+                moves.setdefault(topic, []).append((record_id, page["embeddings"][i], page["documents"][i], meta))
+        for target_name, records in moves.items():
+            target = get_or_create_collection(client, target_name)
+            for i in range(0, len(records), COPY_BATCH_SIZE):
+                batch = records[i:i + COPY_BATCH_SIZE]
+                target.add(ids=[r[0] for r in batch], embeddings=[r[1] for r in batch],
+                           documents=[r[2] for r in batch], metadatas=[r[3] for r in batch])
+                source.delete(ids=[r[0] for r in batch])
+            moved_sources += [(r[3].get("source"), name, target_name) for r in records]
+            moved[f"{name}->{target_name}"] = len(records)
+            print(f"Moved {len(records)} chunks from '{name}' to '{target_name}'")
+
+    # Keep the manifest's collections accurate so re-ingesting a file finds all its chunks
+    manifest = load_manifest(manifest_path)
+    updated = False
+    for path, from_name, to_name in moved_sources:
+        entry = manifest.get(path)
+        if entry is None:
+            continue
+        counts = entry.setdefault("collections", {})
+        counts[from_name] = counts.get(from_name, 0) - 1
+        if counts[from_name] <= 0:
+            del counts[from_name]
+        counts[to_name] = counts.get(to_name, 0) + 1
+        updated = True
+    if updated:
+        save_manifest(manifest, manifest_path)
+    return moved
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage ChromaDB vector indexes")
+    parser.add_argument("command", choices=["stats", "tune", "compact", "rebalance"])
+    parser.add_argument("collections", nargs="*", help="Collections to act on (default: all agent collections)")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Compact without removing duplicate chunks")
+    parser.add_argument("--manifest", default=None, help="Ingest manifest updated by rebalance (default: INGEST_MANIFEST_PATH)")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(index_stats(), indent=2))
+    elif args.command == "rebalance":
+        rebalance_collections(chromadb.PersistentClient(path=CHROMA_PATH), args.collections or None, args.manifest)
+    else:
+        client = chromadb.PersistentClient(path=CHROMA_PATH)
+        existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+        for name in args.collections or [c for c in AGENT_COLLECTIONS if c in existing]:
+            if args.command == "tune":
+                tune_collection(client, name)
+            else:
+                compact_collection(client, name, dedupe=not args.keep_duplicates)
@@ -0,0 +1,46 @@
+import os, sys
+import pytest
+
+# Backend modules import each other as top-level modules (run from backend/app)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+@pytest.fixture
+def chroma_client(tmp_path, monkeypatch):
+    """A ChromaDB client on a temporary directory, used by every module under test."""
+    chromadb = pytest.importorskip("chromadb")
+    ingest_pdf = pytest.importorskip("ingest_pdf")
+    import vector_index, faq_answers
+    path = str(tmp_path / "chroma_db")
+    for module in (ingest_pdf, vector_index, faq_answers):
+        monkeypatch.setattr(module, "CHROMA_PATH", path)
+    monkeypatch.setattr(faq_answers, "_faq_collection", None)
+    return chromadb.PersistentClient(path=path)
+
+@pytest.fixture
+def fake_pdfs(tmp_path, monkeypatch):
+    """
+    Write text files standing in for PDFs (pages separated by form feeds) and
+    ingest them with a local loader and deterministic embeddings.
+    """
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    ingest_pdf = pytest.importorskip("ingest_pdf")
+
+    class TextPageLoader:
+        def __init__(self, path):
+            self.path = path
+
+        def load(self):
+            with open(self.path) as f:
+                pages = f.read().split("\f")
+            return [Document(page_content=text, metadata={"source": self.path, "page": i}) for i, text in enumerate(pages)]
+
+    monkeypatch.setattr(ingest_pdf, "PyPDFLoader", TextPageLoader)
+    monkeypatch.setattr(ingest_pdf, "make_embeddings", lambda **kwargs: DeterministicFakeEmbedding(size=8))
+
+    def write(name: str, *pages: str) -> str:
+        path = tmp_path / "pdfs" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("\f".join(pages))
+        return str(path)
+    return write
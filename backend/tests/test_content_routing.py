@@ -0,0 +1,80 @@
+import pytest
+
+ingest_pdf = pytest.importorskip("ingest_pdf")
+from langchain_core.documents import Document
+from ingest_pdf import assign_collections, classify_text, ingest_paths, load_manifest, ROUTED_COLLECTIONS
+from vector_index import rebalance_collections
+
+BILLING = "The monthly fee is charged on each invoice payment."
+TECH = "If login fails, reset your password and check the API endpoint rate limits."
+GENERAL = "Our team is happy to help. Take a rest and plan your day with the app."
+
+# ---- classify_text ----
+def test_clear_topics_are_classified():
+    assert classify_text(BILLING) == ("billing_docs", 1.0)
+    assert classify_text(TECH) == ("tech_docs", 1.0)
+
+def test_everyday_words_give_no_signal():
+    assert classify_text(GENERAL) == (None, 0.0)
+    assert classify_text("An error occurred while earning interest.") == (None, 0.0)
+
+def test_single_hit_is_not_enough():
+    assert classify_text("A small fee applies.") == (None, 0.0)
+
+def test_narrow_win_below_min_score_gives_no_signal():
+    # 3 billing hits vs 2 tech hits: score 0.6 < MIN_TOPIC_SCORE
+    text = "Refund policy: the fee is waived if a payment fails after a login timeout."
+    assert classify_text(text) == (None, 0.0)
+
+def test_tie_gives_no_signal(monkeypatch):
+    monkeypatch.setattr(ingest_pdf, "MIN_TOPIC_SCORE", 0.0)
+    assert classify_text("fee payment login password") == (None, 0.0)
+
+# ---- assign_collections ----
+def _chunk(text: str, page: int = 0) -> Document:
+    return Document(page_content=text, metadata={"page": page})
+
+def test_chunk_topic_then_page_topic_then_filename():
+    pages = [_chunk(BILLING + " " + GENERAL, 0), _chunk(GENERAL, 1)]
+    chunks = [_chunk(TECH, 0), _chunk(GENERAL, 0), _chunk(GENERAL, 1)]
+    assignments = assign_collections(chunks, pages, "login_guide.pdf")
+    assert [a[0] for a in assignments] == ["tech_docs", "billing_docs", "tech_docs"]
+    assert [a[1]["topic_source"] for a in assignments] == ["chunk", "page", "filename"]
+
+def test_unrouted_file_without_signal_goes_to_default():
+    assignments = assign_collections([_chunk(GENERAL)], [_chunk(GENERAL)], "notes.pdf")
+    assert assignments[0][0] == ingest_pdf.DEFAULT_COLLECTION
+
+def test_explicit_collection_wins():
+    assignments = assign_collections([_chunk(BILLING)], [_chunk(BILLING)], "notes.pdf", collection_name="custom")
+    assert assignments == [("custom", {"collection": "custom", "topic_source": "explicit"})]
+
+def test_content_routing_off_uses_filename(monkeypatch):
+    monkeypatch.setattr(ingest_pdf, "CONTENT_ROUTING", False)
+    assignments = assign_collections([_chunk(TECH)], [_chunk(TECH)], "billing_faq.pdf")
+    assert assignments[0] == ("billing_docs", {"collection": "billing_docs", "topic_source": "filename"})
+
+# ---- rebalance ----
+
+def stored_documents(client, source: str) -> list:
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    docs = []
+    for name in ROUTED_COLLECTIONS:
+        if name in existing:
+            docs += client.get_collection(name).get(where={"source": source})["documents"]
+    return docs
+
+def test_reingest_after_rebalance_leaves_no_orphans(chroma_client, fake_pdfs, tmp_path, monkeypatch):
+    manifest = str(tmp_path / "ingest_manifest.jsonl")
+    # Ingested before content routing: the filename sends it to pdf_docs
+    monkeypatch.setattr(ingest_pdf, "CONTENT_ROUTING", False)
+    path = fake_pdfs("guide.pdf", BILLING)
+    ingest_paths([path], manifest_path=manifest)
+    assert chroma_client.get_collection("pdf_docs").count() == 1
+
+    assert rebalance_collections(chroma_client, manifest_path=manifest) == {"pdf_docs->billing_docs": 1}
+    assert load_manifest(manifest)[path]["collections"] == {"billing_docs": 1}
+
+    fake_pdfs("guide.pdf", "Updated guide without the old text.")
+    ingest_paths([path], manifest_path=manifest)
+    assert stored_documents(chroma_client, path) == ["Updated guide without the old text."]
@@ -0,0 +1,45 @@
+import time
+import pytest
+
+import degraded_mode
+from degraded_mode import OverloadMonitor
+
+def test_too_few_samples_do_not_degrade():
+    monitor = OverloadMonitor()
+    for _ in range(degraded_mode.MIN_SAMPLES - 1):
+        monitor.record_latency(100.0)
+    assert monitor.p95_latency() is None
+    assert not monitor.should_degrade()
+
+def test_slow_p95_degrades(monkeypatch):
+    monkeypatch.setattr(degraded_mode, "DEGRADED_LATENCY_SLO_SECONDS", 1.0)
+    monitor = OverloadMonitor()
+    for latency in (0.1, 0.2, 0.3, 0.4, 5.0):
+        monitor.record_latency(latency)
+    assert monitor.p95_latency() == 5.0
+    assert monitor.should_degrade()
+
+def test_inflight_limit_degrades(monkeypatch):
+    monkeypatch.setattr(degraded_mode, "DEGRADED_MAX_INFLIGHT", 2)
+    monitor = OverloadMonitor()
+    monitor.request_started()
+    assert not monitor.should_degrade()
+    monitor.request_started()
+    assert monitor.should_degrade()
+    monitor.request_finished()
+    assert not monitor.should_degrade()
+
+def test_old_samples_expire_so_mode_recovers(monkeypatch):
+    monkeypatch.setattr(degraded_mode, "DEGRADED_LATENCY_SLO_SECONDS", 1.0)
+    monkeypatch.setattr(degraded_mode, "DEGRADED_WINDOW_SECONDS", 0.05)
+    monitor = OverloadMonitor()
+    for _ in range(degraded_mode.MIN_SAMPLES):
+        monitor.record_latency(5.0)
+    assert monitor.should_degrade()
+    time.sleep(0.06)
+    assert not monitor.should_degrade()
+
+def test_auto_off_never_degrades(monkeypatch):
+    monkeypatch.setattr(degraded_mode, "DEGRADED_AUTO", False)
+    monkeypatch.setattr(degraded_mode, "DEGRADED_MAX_INFLIGHT", 0)
+    assert not OverloadMonitor().should_degrade()
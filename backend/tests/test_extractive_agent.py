@@ -0,0 +1,53 @@
+import pytest
+
+extractive_agent = pytest.importorskip("agents.extractive_agent")
+import faq_answers
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+def test_degraded_answer_serves_matching_faq_first(chroma_client, monkeypatch):
+    monkeypatch.setattr(faq_answers, "_faq_embeddings", DeterministicFakeEmbedding(size=8))
+    faq_answers.store_faq_pairs([{"question": "What is the fee?", "answer": "The fee is 5 dollars."}],
+                                {"source": "/docs/pricing.pdf", "filename": "pricing.pdf"}, "v1")
+    monkeypatch.setattr(extractive_agent, "retrieve_chunks", lambda *a, **k: pytest.fail("retrieval not expected"))
+    assert extractive_agent.answer_extractively("What is the fee?") == "The fee is 5 dollars."
+
+def _chunk(collection: str, rank: int, distance: float) -> dict:
+    return {"id": f"{collection}-{rank}", "text": "", "metadata": {}, "collection": collection,
+            "rank": rank, "distance": distance}
+
+def test_same_space_results_merge_by_distance():
+    chunks = [_chunk("billing_docs", 0, 0.9), _chunk("billing_docs", 1, 1.2), _chunk("tech_docs", 0, 0.1)]
+    merged = extractive_agent.merge_results(chunks)
+    assert [c["id"] for c in merged] == ["tech_docs-0", "billing_docs-0", "billing_docs-1"]
+
+def test_mixed_space_results_merge_by_rank(monkeypatch):
+    import vector_index
+    monkeypatch.setattr(vector_index, "COLLECTION_OVERRIDES", {"tech_docs": {"space": "ip"}})
+    # Inner-product distances are not comparable with l2 ones
+    chunks = [_chunk("billing_docs", 0, 0.9), _chunk("billing_docs", 1, 1.2), _chunk("tech_docs", 0, -5.0),
+              _chunk("tech_docs", 1, -4.0)]
+    merged = extractive_agent.merge_results(chunks)
+    assert [c["id"] for c in merged] == ["billing_docs-0", "tech_docs-0", "billing_docs-1", "tech_docs-1"]
+
+# ---- select_sentences ----
+def _doc(text: str, filename: str = "pricing.pdf", page: int = 0) -> dict:
+    return {"id": filename, "text": text, "metadata": {"filename": filename, "page": page}}
+
+def test_select_sentences_prefers_rare_question_terms_and_cites_pages():
+    chunks = [
+        _doc("Our pricing is simple for everyone. The withdrawal fee is 25 dollars per wire.", page=2),
+        _doc("Pricing tiers are listed on the website for every customer.", filename="overview.pdf"),
+    ]
+    selected = extractive_agent.select_sentences("What is the withdrawal fee?", chunks, max_sentences=1)
+    assert selected == [("The withdrawal fee is 25 dollars per wire.", "[pricing.pdf, p. 3]")]
+
+def test_select_sentences_keeps_document_order_and_drops_duplicates():
+    text = "Refunds take five business days to process. Refunds are issued to the original card only."
+    chunks = [_doc(text), _doc(text)]
+    selected = extractive_agent.select_sentences("How do refunds work?", chunks, max_sentences=3)
+    assert [s for s, _ in selected] == ["Refunds take five business days to process.",
+                                        "Refunds are issued to the original card only."]
+
+def test_select_sentences_without_overlap_returns_nothing():
+    chunks = [_doc("Our offices are closed on public holidays in December.")]
+    assert extractive_agent.select_sentences("How do I reset my password?", chunks) == []
@@ -0,0 +1,41 @@
+import pytest
+
+faq_answers = pytest.importorskip("faq_answers")
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+@pytest.fixture
+def faq_embeddings(monkeypatch):
+    monkeypatch.setattr(faq_answers, "_faq_embeddings", DeterministicFakeEmbedding(size=8))
+
+def test_reingest_without_precompute_drops_stale_pairs(chroma_client, fake_pdfs, faq_embeddings, tmp_path):
+    from ingest_pdf import ingest_paths
+    path = fake_pdfs("pricing.pdf", "The fee is 5 dollars per invoice payment.")
+    faq_answers.store_faq_pairs([{"question": "What is the fee?", "answer": "5 dollars"}],
+                                {"source": path, "filename": "pricing.pdf"}, "v1")
+    assert faq_answers.lookup_faq_answer("What is the fee?")["answer"] == "5 dollars"
+
+    ingest_paths([path], manifest_path=str(tmp_path / "manifest.jsonl"), precompute_faq=False)
+    assert faq_answers.lookup_faq_answer("What is the fee?") is None
+
+def test_same_named_documents_keep_separate_pairs(chroma_client, faq_embeddings):
+    pair = [{"question": "What is the fee?", "answer": "A"}]
+    faq_answers.store_faq_pairs(pair, {"source": "/eu/pricing.pdf", "filename": "pricing.pdf"}, "v1")
+    faq_answers.store_faq_pairs(pair, {"source": "/us/pricing.pdf", "filename": "pricing.pdf"}, "v1")
+    assert faq_answers.get_faq_collection().count() == 2
+
+# ---- _parse_pairs ----
+def test_parse_pairs_reads_json_array():
+    content = '[{"question": "What is the fee?", "answer": "5 dollars"}]'
+    assert faq_answers._parse_pairs(content) == [{"question": "What is the fee?", "answer": "5 dollars"}]
+
+def test_parse_pairs_strips_markdown_fences():
+    content = '```json\n[{"question": " Q? ", "answer": " A. "}]\n```'
+    assert faq_answers._parse_pairs(content) == [{"question": "Q?", "answer": "A."}]
+
+def test_parse_pairs_skips_malformed_items():
+    content = '[{"question": "Q?"}, "text", {"question": "", "answer": "A"}, {"question": "Q2?", "answer": "A2"}]'
+    assert faq_answers._parse_pairs(content) == [{"question": "Q2?", "answer": "A2"}]
+
+def test_parse_pairs_rejects_non_json_and_non_lists():
+    assert faq_answers._parse_pairs("Sorry, I can't help with that.") == []
+    assert faq_answers._parse_pairs('{"question": "Q?", "answer": "A"}') == []
@@ -0,0 +1,78 @@
+import json
+import pytest
+
+ingest_pdf = pytest.importorskip("ingest_pdf")
+from ingest_pdf import append_manifest, busy_seconds, ingest_paths, load_manifest, save_manifest, ROUTED_COLLECTIONS
+
+BILLING = "The fee is charged on each invoice payment."
+TECH = "If login fails, reset your password and check the API endpoint."
+
+def source_documents(client, source: str) -> list:
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    docs = []
+    for name in ROUTED_COLLECTIONS:
+        if name in existing:
+            docs += client.get_collection(name).get(where={"source": source})["documents"]
+    return sorted(docs)
+
+# ---- Manifest ----
+def test_manifest_later_lines_win_and_truncated_line_is_ignored(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    save_manifest({"/a.pdf": {"sha256": "1"}}, path)
+    with open(path, "a") as f:
+        append_manifest(f, "/a.pdf", {"sha256": "2"})
+        append_manifest(f, "/b.pdf", {"sha256": "3"})
+        f.write('{"path": "/c.pdf", "sha2')  # Run killed mid-write
+    manifest = load_manifest(path)
+    assert {p: e["sha256"] for p, e in manifest.items()} == {"/a.pdf": "2", "/b.pdf": "3"}
+
+def test_save_manifest_compacts_to_one_line_per_file(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    save_manifest({"/a.pdf": {"sha256": "1"}}, path)
+    with open(path, "a") as f:
+        append_manifest(f, "/a.pdf", {"sha256": "2"})
+    save_manifest(load_manifest(path), path)
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == [{"path": "/a.pdf", "sha256": "2"}]
+
+def test_missing_manifest_is_empty(tmp_path):
+    assert load_manifest(str(tmp_path / "missing.jsonl")) == {}
+
+# ---- busy_seconds ----
+def test_busy_seconds_merges_overlapping_intervals():
+    assert busy_seconds([]) == 0.0
+    assert busy_seconds([(0, 2), (1, 3), (5, 6)]) == 4.0
+    assert busy_seconds([(0, 5), (1, 2)]) == 5.0
+
+# ---- Resume ----
+def test_unchanged_files_are_skipped(chroma_client, fake_pdfs, tmp_path):
+    manifest = str(tmp_path / "manifest.jsonl")
+    paths = [fake_pdfs("billing.pdf", BILLING), fake_pdfs("tech.pdf", TECH)]
+    assert ingest_paths(paths, manifest_path=manifest)["files"] == 2
+    totals = ingest_paths(paths, manifest_path=manifest)
+    assert (totals["files"], totals["skipped"]) == (0, 2)
+
+def test_changed_file_replaces_its_chunks(chroma_client, fake_pdfs, tmp_path):
+    manifest = str(tmp_path / "manifest.jsonl")
+    path = fake_pdfs("guide.pdf", BILLING)
+    ingest_paths([path], manifest_path=manifest)
+    fake_pdfs("guide.pdf", TECH)
+    assert ingest_paths([path], manifest_path=manifest)["files"] == 1
+    assert source_documents(chroma_client, path) == [TECH]
+    assert load_manifest(manifest)[path]["collections"] == {"tech_docs": 1}
+
+def test_force_reingests_without_duplicates(chroma_client, fake_pdfs, tmp_path):
+    manifest = str(tmp_path / "manifest.jsonl")
+    path = fake_pdfs("guide.pdf", BILLING, TECH)
+    ingest_paths([path], manifest_path=manifest)
+    assert ingest_paths([path], manifest_path=manifest, force=True)["files"] == 1
+    assert source_documents(chroma_client, path) == sorted([BILLING, TECH])
+
+def test_resume_after_run_killed_before_manifest_write(chroma_client, fake_pdfs, tmp_path):
+    manifest = str(tmp_path / "manifest.jsonl")
+    path = fake_pdfs("guide.pdf", BILLING)
+    # Chunks written, but the run died before the manifest line was appended
+    ingest_pdf.ingest_pdf_file(path, metadata={"source": path, "filename": "guide.pdf"})
+    assert load_manifest(manifest) == {}
+    assert ingest_paths([path], manifest_path=manifest)["files"] == 1
+    assert source_documents(chroma_client, path) == [BILLING]
@@ -0,0 +1,178 @@
+import time, threading
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatResult, ChatGeneration
+
+from agents import llm_provider
+import traffic_capture
+from agents.llm_provider import CircuitBreaker, HedgedChatModel, RecordedChatModel, get_llm_metrics
+
+class StubChatModel(BaseChatModel):
+    """Local stand-in for a provider: answers after `delay` seconds or raises."""
+    reply: str = "ok"
+    delay: float = 0.0
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.reply} unavailable")
+        usage = {"input_tokens": 3, "output_tokens": 2, "total_tokens": 5}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply, usage_metadata=usage))])
+
+@pytest.fixture(autouse=True)
+def reset_metrics(monkeypatch):
+    llm_provider._breakers.clear()
+    llm_provider._stats.clear()
+    for key in llm_provider._hedge_counts:
+        llm_provider._hedge_counts[key] = 0
+    monkeypatch.setattr(llm_provider, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(llm_provider, "HEDGE_MIN_DELAY", 0.01)
+
+def hedged(primary, secondary=None, **kwargs):
+    return HedgedChatModel(primary=primary, primary_name="primary",
+                           secondary=secondary, secondary_name="secondary" if secondary else "",
+                           max_retries=0, **kwargs)
+
+# ---- CircuitBreaker ----
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_half_open_breaker_admits_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+# ---- HedgedChatModel._race ----
+def test_fast_primary_is_not_hedged():
+    model = hedged(StubChatModel(reply="primary"), StubChatModel(reply="secondary"))
+    assert model.invoke("hi").content == "primary"
+    metrics = get_llm_metrics()
+    assert metrics["hedged"] == 0 and metrics["failovers"] == 0
+
+def test_slow_primary_is_hedged_and_secondary_wins():
+    model = hedged(StubChatModel(reply="primary", delay=0.5), StubChatModel(reply="secondary"))
+    assert model.invoke("hi").content == "secondary"
+    metrics = get_llm_metrics()
+    assert metrics["hedged"] == 1
+    assert metrics["hedge_wins"] == 1
+    assert metrics["hedge_win_rate"] == 1.0
+    assert metrics["failovers"] == 0
+
+def test_failing_primary_counts_failovers_not_hedges():
+    model = hedged(StubChatModel(reply="primary", fail=True), StubChatModel(reply="secondary"))
+    for _ in range(3):
+        assert model.invoke("hi").content == "secondary"
+    metrics = get_llm_metrics()
+    assert metrics["failovers"] == 3
+    assert metrics["failover_wins"] == 3
+    assert metrics["hedged"] == 0
+    assert metrics["hedge_wins"] == 0
+    assert metrics["hedge_win_rate"] == 0.0
+
+def test_open_primary_breaker_routes_to_secondary():
+    llm_provider._breaker("primary").opened_at = time.monotonic()
+    llm_provider._breaker("primary").failures = llm_provider.BREAKER_FAILURE_THRESHOLD
+    model = hedged(StubChatModel(reply="primary"), StubChatModel(reply="secondary"))
+    assert model.invoke("hi").content == "secondary"
+    assert get_llm_metrics()["providers"]["secondary"]["wins"] == 1
+
+def test_all_providers_failing_raises_last_error():
+    model = hedged(StubChatModel(reply="primary", fail=True), StubChatModel(reply="secondary", fail=True))
+    with pytest.raises(RuntimeError, match="secondary unavailable"):
+        model.invoke("hi")
+
+def test_deadline_exceeded_raises_timeout():
+    model = hedged(StubChatModel(reply="primary", delay=0.5), StubChatModel(reply="secondary", delay=0.5),
+                   deadline_seconds=0.1)
+    with pytest.raises(TimeoutError):
+        model.invoke("hi")
+
+def _invoke_concurrently(model, n: int) -> float:
+    start = time.monotonic()
+    threads = [threading.Thread(target=model.invoke, args=("hi",)) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.monotonic() - start
+
+def test_single_provider_is_called_inline():
+    caller = threading.current_thread().name
+    seen = []
+
+    class ThreadRecordingStub(StubChatModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            seen.append(threading.current_thread().name)
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    assert hedged(ThreadRecordingStub(reply="primary")).invoke("hi").content == "primary"
+    assert seen == [caller]
+
+def test_concurrent_calls_are_not_queued_behind_each_other(monkeypatch):
+    monkeypatch.setattr(llm_provider, "HEDGE_DEFAULT_DELAY", 0.5)
+    model = hedged(StubChatModel(reply="primary", delay=0.2), StubChatModel(reply="secondary"))
+    elapsed = _invoke_concurrently(model, 48)
+    assert elapsed < 0.5
+    assert get_llm_metrics()["hedged"] == 0
+
+def test_concurrent_single_provider_calls_run_in_parallel():
+    elapsed = _invoke_concurrently(hedged(StubChatModel(reply="primary", delay=0.2)), 48)
+    assert elapsed < 0.5
+
+# ---- RecordedChatModel ----
+@pytest.fixture
+def capture(monkeypatch):
+    monkeypatch.setattr(traffic_capture, "CAPTURE_ENABLED", True)
+    record = traffic_capture.start_capture("hi")
+    yield record
+    traffic_capture._current_record.set(None)
+    traffic_capture._capture_handler.set(None)
+
+def test_capture_records_provider_call_and_tokens_once(capture):
+    model = RecordedChatModel(inner=StubChatModel(reply="primary"), provider_name="openai")
+    assert model.invoke("hi").content == "primary"
+    assert [(c["provider"], c["content"]) for c in capture["provider_calls"]] == [("openai", "primary")]
+    assert capture["tokens"] == {"prompt": 3, "completion": 2, "total": 5}
+
+def test_capture_attributes_hedged_answer_to_winner(capture):
+    inner = hedged(StubChatModel(reply="primary", delay=0.5), StubChatModel(reply="secondary"))
+    RecordedChatModel(inner=inner, provider_name="primary").invoke("hi")
+    assert capture["provider_calls"][0]["provider"] == "secondary"
+    assert capture["tokens"]["total"] == 5
+
+def test_playback_serves_recorded_response(monkeypatch):
+    model = RecordedChatModel(inner=StubChatModel(reply="live", fail=True), provider_name="openai")
+    key = traffic_capture.provider_call_key(model._convert_input("hi").to_messages())
+    monkeypatch.setattr(traffic_capture, "PLAYBACK_PATH", "capture")
+    monkeypatch.setattr(traffic_capture, "_playback", {key: {"content": "recorded", "latency": 0.0}})
+    assert model.invoke("hi").content == "recorded"
+
+def test_recorded_model_calls_run_in_parallel():
+    model = RecordedChatModel(inner=StubChatModel(reply="primary", delay=0.2), provider_name="openai")
+    assert _invoke_concurrently(model, 48) < 0.5
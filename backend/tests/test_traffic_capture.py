@@ -0,0 +1,69 @@
+import gzip, json
+import pytest
+
+import traffic_capture
+from traffic_capture import CaptureWriter, PlaybackMiss, capture_files, read_capture
+
+def test_writer_rotates_and_keeps_newest_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_capture, "CAPTURE_MAX_RECORDS", 2)
+    monkeypatch.setattr(traffic_capture, "CAPTURE_KEEP_FILES", 2)
+    writer = CaptureWriter(str(tmp_path))
+    for i in range(7):
+        writer.write({"n": i})
+    writer.close()
+    files = capture_files(str(tmp_path))
+    assert len(files) == 2
+    # Oldest files were removed: records 0-3 are gone
+    assert [r["n"] for r in read_capture(files)] == [4, 5, 6]
+
+def test_records_are_readable_while_file_is_still_open(tmp_path):
+    writer = CaptureWriter(str(tmp_path))
+    writer.write({"n": 1})
+    assert [r["n"] for r in read_capture(capture_files(str(tmp_path)))] == [1]
+    writer.close()
+
+def test_read_capture_skips_corrupt_file(tmp_path):
+    (tmp_path / "capture-0-bad.jsonl.gz").write_bytes(b"not gzip")
+    with gzip.open(tmp_path / "capture-1-good.jsonl.gz", "wt") as f:
+        f.write(json.dumps({"n": 1}) + "\n")
+    assert [r["n"] for r in read_capture(capture_files(str(tmp_path)))] == [1]
+
+@pytest.fixture
+def playback(tmp_path, monkeypatch):
+    """Point playback at a capture holding one recorded LLM and one embedding call."""
+    llm_key = traffic_capture.provider_call_key([])
+    embed_key = traffic_capture.embedding_call_key("query", ["hi"])
+    with gzip.open(tmp_path / "capture-1.jsonl.gz", "wt") as f:
+        f.write(json.dumps({"provider_calls": [
+            {"key": llm_key, "provider": "openai", "content": "answer", "latency": 0.5},
+            {"key": embed_key, "provider": "openai-embeddings", "content": [0.1, 0.2], "latency": 0.1},
+        ]}) + "\n")
+    monkeypatch.setattr(traffic_capture, "PLAYBACK_PATH", str(tmp_path))
+    monkeypatch.setattr(traffic_capture, "_playback", None)
+    monkeypatch.setattr(traffic_capture, "_playback_misses", {"llm": 0, "embeddings": 0})
+    return llm_key, embed_key
+
+def test_playback_disabled_returns_none(monkeypatch):
+    monkeypatch.setattr(traffic_capture, "PLAYBACK_PATH", "")
+    assert traffic_capture.playback_response("any") is None
+
+def test_playback_serves_recorded_calls(playback):
+    llm_key, embed_key = playback
+    assert traffic_capture.playback_response(llm_key)["content"] == "answer"
+    assert traffic_capture.playback_response(embed_key, kind="embeddings")["content"] == [0.1, 0.2]
+    assert traffic_capture.playback_stats() == {"enabled": True, "recorded_calls": 2,
+                                                "misses": {"llm": 0, "embeddings": 0}}
+
+def test_playback_misses_raise_and_are_counted(playback, monkeypatch):
+    monkeypatch.setattr(traffic_capture, "CAPTURE_ENABLED", True)
+    record = traffic_capture.start_capture("hi")
+    try:
+        with pytest.raises(PlaybackMiss):
+            traffic_capture.playback_response("unknown")
+        with pytest.raises(PlaybackMiss):
+            traffic_capture.playback_response("unknown", kind="embeddings")
+    finally:
+        traffic_capture._current_record.set(None)
+        traffic_capture._capture_handler.set(None)
+    assert traffic_capture.playback_stats()["misses"] == {"llm": 1, "embeddings": 1}
+    assert record["playback_misses"] == 2
@@ -0,0 +1,64 @@
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+from vector_index import compact_collection, hnsw_configuration
+
+def collection_names(client) -> set:
+    return {c if isinstance(c, str) else c.name for c in client.list_collections()}
+
+def add_chunks(col, docs: list):
+    col.add(ids=[f"id-{i}" for i in range(len(docs))], embeddings=[[float(i), 0.0] for i in range(len(docs))],
+            documents=[d for d, _ in docs], metadatas=[{"source": s, "page": 0} for _, s in docs])
+
+@pytest.fixture
+def billing(chroma_client):
+    col = chroma_client.create_collection("billing_docs", configuration=hnsw_configuration("billing_docs"))
+    add_chunks(col, [("fee", "/a.pdf"), ("fee", "/a.pdf"), ("refund", "/a.pdf")])
+    return col
+
+def test_compact_removes_duplicates_and_keeps_name(chroma_client, billing):
+    assert compact_collection(chroma_client, "billing_docs") == {"name": "billing_docs", "before": 3, "after": 2}
+    assert collection_names(chroma_client) == {"billing_docs"}
+    assert sorted(chroma_client.get_collection("billing_docs").get()["documents"]) == ["fee", "refund"]
+
+def test_keep_duplicates(chroma_client, billing):
+    assert compact_collection(chroma_client, "billing_docs", dedupe=False)["after"] == 3
+
+class RenameFailingClient:
+    """Client whose rebuilt collection cannot be renamed (e.g. the process dies mid-swap)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def create_collection(self, *args, **kwargs):
+        col = self.client.create_collection(*args, **kwargs)
+
+        class Collection:
+            def __getattr__(self, name):
+                return getattr(col, name)
+
+            def modify(self, **kwargs):
+                raise RuntimeError("rename failed")
+        return Collection()
+
+def test_failed_swap_restores_original(chroma_client, billing):
+    with pytest.raises(RuntimeError, match="rename failed"):
+        compact_collection(RenameFailingClient(chroma_client), "billing_docs")
+    assert "billing_docs" in collection_names(chroma_client)
+    assert chroma_client.get_collection("billing_docs").count() == 3
+
+def test_interrupted_swap_is_recovered(chroma_client, billing):
+    # Killed after the original was renamed to the backup, before the rebuild took its name
+    billing.modify(name="billing_docs__backup")
+    chroma_client.create_collection("billing_docs__rebuild", configuration=hnsw_configuration("billing_docs"))
+    assert compact_collection(chroma_client, "billing_docs")["after"] == 2
+    assert collection_names(chroma_client) == {"billing_docs"}
+
+def test_stale_backup_is_dropped(chroma_client, billing):
+    # Killed after the swap, before the backup was deleted
+    chroma_client.create_collection("billing_docs__backup")
+    compact_collection(chroma_client, "billing_docs")
+    assert collection_names(chroma_client) == {"billing_docs"}